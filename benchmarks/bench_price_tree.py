@@ -0,0 +1,69 @@
+"""
+Benchmark of the closed form construction of the stock price tree against the
+previous construction, that appended one level at a time.
+The full tree has (steps + 1)(steps + 2) / 2 nodes, so 50,000 steps need about 10GB of memory.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from binompricer import Stock
+
+
+def loop_price_tree(stock):
+    """
+    Price tree construction with one concatenation per time step
+    """
+    price_tree = [np.array([stock.initial_price])]
+    for i in range(stock.steps):
+        prev_branches = price_tree[-1]
+        if stock.tree_method == 'multiply':
+            st = np.concatenate((prev_branches * stock.u, [prev_branches[-1] * stock.d]))
+        else:
+            st = np.concatenate((prev_branches + stock.u, [prev_branches[-1] - stock.d]))
+        price_tree.append(st)
+    return price_tree
+
+
+def best_time(func, repeat):
+    """
+    Returns the best wall time of 'repeat' calls of func
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def closed_form_price_tree(stock):
+    """
+    Price tree construction in closed form
+    """
+    stock.price_tree = None
+    stock.calc_price_tree()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=int, nargs='+', default=[100, 1000, 5000, 10000, 20000, 50000])
+    parser.add_argument('--method', choices=['multiply', 'add'], default='multiply')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'steps':>8} {'loop (s)':>12} {'closed form (s)':>16} {'speed-up':>9}")
+    for steps in args.steps:
+        stock = Stock(initial_price=100, steps=steps, maturity=1, price_changes=[1.01, 0.99],
+                      tree_method=args.method)
+        loop_time = best_time(lambda: loop_price_tree(stock), args.repeat)
+        closed_form_time = best_time(lambda: closed_form_price_tree(stock), args.repeat)
+        print(f"{steps:>8} {loop_time:>12.5f} {closed_form_time:>16.5f} {loop_time / closed_form_time:>8.1f}x")
@@ -0,0 +1,213 @@
+"""
+Benchmark suite for the construction of the trees, pricing and hedging.
+Each benchmark is timed for a range of steps, reporting the best wall time of a number
+of repeats and the peak memory allocated during one call, as traced by tracemalloc.
+Results are saved as JSON, and two result files can be compared to flag regressions.
+
+    python benchmarks/suite.py run --steps 10 100 1000 --output new.json
+    python benchmarks/suite.py compare old.json new.json --threshold 0.25
+
+Full trees have (steps + 1)(steps + 2) / 2 nodes, so pricing with 20,000 steps
+needs a few GB of memory.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from binompricer import Stock
+from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer import BinomialTreeFutures
+
+DEFAULT_STEPS = [10, 100, 1000, 5000, 20000]
+
+
+def stock(steps, tree_method='multiply', rates_tree=False):
+    """
+    Returns a stock whose trees are not calculated yet
+    """
+    int_rates_tree = [np.full(n + 1, 0.05) for n in range(steps)] if rates_tree else None
+    return Stock(initial_price=100, steps=steps, maturity=1, price_changes=[1.01, 0.99],
+                 tree_method=tree_method, int_rates_tree=int_rates_tree)
+
+
+def priced_stock(steps, tree_method='multiply', rates_tree=False):
+    """
+    Returns a stock with the price tree and interest factors calculated
+    """
+    underlying = stock(steps, tree_method, rates_tree)
+    underlying.calc_price_tree()
+    underlying.calc_interest_factors()
+    return underlying
+
+
+def option(model, steps, is_put=False, is_american=False):
+    """
+    Returns an option on a stock with 30% volatility
+    """
+    kwargs = dict(strike=100, maturity=1, initial_price=100, steps=steps, is_put=is_put, is_american=is_american)
+    if model is BinomialTreeOption:
+        return model(price_changes=[1.01, 0.99], **kwargs)
+    return model(volatility=0.3, **kwargs)
+
+
+def priced_option(steps):
+    """
+    Returns an American put priced with its trees
+    """
+    priced = option(BinomialTreeOption, steps, is_put=True, is_american=True)
+    priced.price()
+    return priced
+
+
+# Name of the benchmark: (setup that returns the object for a number of steps, timed call on the object)
+BENCHMARKS = {
+    'Stock.calc_price_tree[multiply]': (stock, lambda s: s.calc_price_tree()),
+    'Stock.calc_price_tree[add]': (lambda steps: stock(steps, 'add'), lambda s: s.calc_price_tree()),
+    'Stock.calc_interest_factors': (stock, lambda s: s.calc_interest_factors()),
+    'Stock.calc_interest_factors[rates_tree]': (lambda steps: stock(steps, rates_tree=True),
+                                                lambda s: s.calc_interest_factors()),
+    'Stock.calc_risk_neutral_probs[multiply]': (priced_stock, lambda s: s.calc_risk_neutral_probs()),
+    'Stock.calc_risk_neutral_probs[add]': (lambda steps: priced_stock(steps, 'add'),
+                                           lambda s: s.calc_risk_neutral_probs()),
+    'BinomialTreeOption.price[european call]': (lambda steps: option(BinomialTreeOption, steps),
+                                                lambda o: o.price()),
+    'BinomialTreeOption.price[european put]': (lambda steps: option(BinomialTreeOption, steps, is_put=True),
+                                               lambda o: o.price()),
+    'BinomialTreeOption.price[american call]': (lambda steps: option(BinomialTreeOption, steps, is_american=True),
+                                                lambda o: o.price()),
+    'BinomialTreeOption.price[american put]': (lambda steps: option(BinomialTreeOption, steps, True, True),
+                                               lambda o: o.price()),
+    'BinomialTreeOption.price[american put, premium only]': (
+        lambda steps: option(BinomialTreeOption, steps, True, True), lambda o: o.price(premium_only=True)),
+    'BinomialCRROption.price[american put]': (lambda steps: option(BinomialCRROption, steps, True, True),
+                                              lambda o: o.price()),
+    'BinomialLROption.price[european call]': (lambda steps: option(BinomialLROption, steps + 1 - steps % 2),
+                                              lambda o: o.price()),
+    'BinomialTreeFutures.price': (lambda steps: BinomialTreeFutures(initial_price=100, maturity=1, steps=steps),
+                                  lambda f: f.price()),
+    'BinomialTreeOption.calc_hedge_ratios': (priced_option, lambda o: o.calc_hedge_ratios()),
+}
+
+
+def measure(setup, call, steps, repeat, min_time=0.05):
+    """
+    Returns the best wall time per call of 'repeat' samples, and the peak memory in bytes
+    allocated during one more call. Each sample calls new objects until it lasts min_time,
+    so that fast calls are timed over several calls. Memory is traced separately,
+    as tracing slows the call.
+    """
+    timings = []
+    for _ in range(repeat):
+        elapsed, calls = 0, 0
+        while elapsed < min_time or calls == 0:
+            obj = setup(steps)
+            start = time.perf_counter()
+            call(obj)
+            elapsed += time.perf_counter() - start
+            calls += 1
+        timings.append(elapsed / calls)
+
+    obj = setup(steps)
+    tracemalloc.start()
+    try:
+        call(obj)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak_memory
+
+
+def commit():
+    """
+    Returns the current git commit of the repository, if available
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(steps_list, repeat, names=None, min_time=0.05):
+    """
+    Runs the benchmarks whose name contains one of the given names, or all of them
+    :return: dictionary with the environment and one result per benchmark and number of steps
+    """
+    results = []
+    for name, (setup, call) in BENCHMARKS.items():
+        if names and not any(pattern in name for pattern in names):
+            continue
+        for steps in steps_list:
+            wall_time, peak_memory = measure(setup, call, steps, repeat, min_time)
+            results.append({'name': name, 'steps': steps, 'time': wall_time, 'peak_memory': peak_memory})
+            print(f"{name:<55} {steps:>7} {wall_time:>12.6f}s {peak_memory / 2 ** 20:>10.2f}MB", flush=True)
+    return {'commit': commit(), 'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'repeat': repeat, 'results': results}
+
+
+def compare(old, new, threshold, time_floor=1e-5, memory_floor=2 ** 16):
+    """
+    Compares two result files and returns the benchmarks that are slower or use more memory
+    than the old ones by more than the threshold. Differences below the floors are noise.
+    """
+    old_results = {(result['name'], result['steps']): result for result in old['results']}
+    regressions = []
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'benchmark':<55} {'steps':>7} {'time':>9} {'memory':>9}")
+    for result in new['results']:
+        key = (result['name'], result['steps'])
+        if key not in old_results:
+            continue
+        time_ratio = result['time'] / old_results[key]['time']
+        memory_ratio = result['peak_memory'] / max(old_results[key]['peak_memory'], 1)
+        time_difference = result['time'] - old_results[key]['time']
+        memory_difference = result['peak_memory'] - old_results[key]['peak_memory']
+        regressed = ((time_ratio > 1 + threshold and time_difference > time_floor)
+                     or (memory_ratio > 1 + threshold and memory_difference > memory_floor))
+        if regressed:
+            regressions.append(result)
+        print(f"{result['name']:<55} {result['steps']:>7} {time_ratio:>8.2f}x {memory_ratio:>8.2f}x"
+              f"{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--steps', type=int, nargs='+', default=DEFAULT_STEPS)
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--min-time', type=float, default=0.05, help='minimum duration of a sample in seconds')
+    run_parser.add_argument('--filter', nargs='+', help='run only the benchmarks whose name contains one of these')
+    run_parser.add_argument('--output', help='JSON file to save the results to')
+    compare_parser = subparsers.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.25,
+                                help='relative increase of time or memory that is a regression')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = run(args.steps, args.repeat, args.filter, args.min_time)
+        if args.output:
+            with open(args.output, 'w') as file:
+                json.dump(report, file, indent=2)
+    else:
+        with open(args.old) as old_file, open(args.new) as new_file:
+            old_report, new_report = json.load(old_file), json.load(new_file)
+        if compare(old_report, new_report, args.threshold):
+            sys.exit(1)
@@ -0,0 +1,99 @@
+import numpy as np
+
+from . import Kernels
+from .BlackScholes import bs_price
+from .Lattice import level_factors
+
+
+def price_trees(initial_price, u, d, int_rate, dividents, dt, strike, steps,
+                is_put=False, is_american=False, volatility=0, smoothing=None, escrow=None, dtype=float):
+    """
+    Prices a batch of options, each on its own 'multiply' tree with constant parameters.
+    All the parameters except steps and smoothing can be arrays that broadcast together,
+    one entry per tree. The backward induction runs in place over a 2D (nodes x trees) array,
+    and the stock prices of each level are rolled back from the next level.
+    :param initial_price: value of the stock at time t=0
+    :param u: factor of the price change to the up-state
+    :param d: factor of the price change to the down-state
+    :param int_rate: risk-free interest rate
+    :param dividents: divident yield
+    :param dt: length of a time step
+    :param strike: strike price
+    :param steps: steps of the trees
+    :param is_put: True for put options
+    :param is_american: True for American options
+    :param volatility: volatility, needed for the 'bbs' smoothing
+    :param smoothing: None, or 'bbs' for the Black-Scholes value over the last step
+    :param escrow: present values of the discrete dividends in escrow at every time step, with one row
+                   per step that broadcasts against the trees; the trees start from the initial price
+                   net of the escrowed dividends
+    :param dtype: floating point type of the backward induction. The parameters of the trees and the
+                  prices at maturity are calculated in double precision and then rounded to it.
+    :return: array of premiums
+    """
+    initial_price, u, d, int_rate, dividents, dt, strike, is_put, is_american, volatility = np.broadcast_arrays(
+        *[np.asarray(param, dtype=float) for param in (initial_price, u, d, int_rate, dividents, dt, strike)],
+        np.asarray(is_put, dtype=bool), np.asarray(is_american, dtype=bool), np.asarray(volatility, dtype=float))
+    shape = initial_price.shape
+    initial_price, u, d, int_rate, dividents, dt, strike, volatility, is_put, is_american = [
+        np.ravel(param) for param in (initial_price, u, d, int_rate, dividents, dt, strike, volatility,
+                                      is_put, is_american)]
+    sign = np.where(is_put, -1., 1.)
+    if escrow is not None:
+        escrow = np.broadcast_to(np.asarray(escrow, dtype=float), (steps + 1,) + shape).reshape(steps + 1, -1)
+
+    # Risk-neutral probabilities, with the discount folded in, for every level
+    dr = np.exp((int_rate - dividents) * dt)
+    probs_up = (dr - d) / (u - d)
+    start = steps - 1 if smoothing == 'bbs' else steps
+    factors = level_factors(np.stack([probs_up, 1 - probs_up]), 1 / dr, start, dtype)
+    # Exercise values are sign * price - sign * strike; European options never exercise early
+    any_american = is_american.any()
+    exercise_sign = np.where(is_american, sign, 0.)
+    exercise_strike = np.where(is_american, sign * strike, np.inf)
+
+    sign, strike, exercise_sign, exercise_strike = [
+        param.astype(dtype, copy=False) for param in (sign, strike, exercise_sign, exercise_strike)]
+
+    # Nodes are along the first axis and trees along the second, so that levels are contiguous
+    downs = np.arange(steps + 1)[:, None]
+    if escrow is not None:
+        initial_price = initial_price - escrow[0]
+    prices = (initial_price * u ** (steps - downs) * d ** downs).astype(dtype, copy=False)
+    inverse_u = 1 / u
+    u = u.astype(dtype, copy=False)
+    if escrow is not None:
+        escrow = escrow.astype(dtype, copy=False)
+    if smoothing == 'bbs':
+        prices = prices[:-1] / u
+        payoffs = bs_price(prices, strike, dt, int_rate, volatility, dividents, is_put).astype(dtype, copy=False)
+        exercise_prices = prices if escrow is None else prices + escrow[start]
+        payoffs = np.maximum(payoffs, exercise_sign * exercise_prices - exercise_strike)
+    else:
+        payoffs = np.maximum(0, sign * (prices - strike if escrow is None else prices + escrow[steps] - strike))
+
+    if Kernels.use_compiled():
+        # The kernel rolls back one tree at a time, with the nodes of each tree contiguous
+        payoffs, prices = np.ascontiguousarray(payoffs.T), np.ascontiguousarray(prices.T)
+        if escrow is None:
+            escrow = np.broadcast_to(np.zeros(1, dtype=dtype), (start, len(u)))
+        Kernels.batch_backward_induction(payoffs, prices, inverse_u, factors, exercise_sign, exercise_strike,
+                                         escrow, start)
+        return payoffs[:, 0].reshape(shape)
+
+    buffer = np.empty_like(payoffs)
+    for i in reversed(range(start)):
+        next_payoffs, payoffs, temp = payoffs, payoffs[:i + 1], buffer[:i + 1]
+        np.multiply(next_payoffs[1:i + 2], factors[i, 1], out=temp)
+        payoffs *= factors[i, 0]
+        payoffs += temp
+        if any_american:
+            prices = prices[:i + 1]
+            prices /= u
+            np.multiply(prices, exercise_sign, out=temp)
+            if escrow is not None:
+                temp += escrow[i] * exercise_sign
+            temp -= exercise_strike
+            np.maximum(payoffs, temp, out=payoffs)
+
+    return payoffs[0].reshape(shape)
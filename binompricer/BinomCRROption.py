@@ -1,17 +1,21 @@
 from .BinomTreeOption import BinomialTreeOption
-import math
+import numpy as np
 
 
 class BinomialCRROption(BinomialTreeOption):
     """
     Price an option with the binomial CRR model
     """
+    convergence_order = 1
+    odd_even_oscillation = True
+
     def __init__(self, strike, maturity, initial_price, price_tree=None, steps=2,
                  probs=(0.5, 0.5), price_changes=(None, None), tree_method='multiply',
                  int_rate=0.05, int_rates_tree=None, volatility=0.3, dividents=0,
-                 is_put=False, is_american=False):
+                 is_put=False, is_american=False, smoothing=None, divident_schedule=None, dtype=float):
         super().__init__(strike, maturity, initial_price, price_tree, steps, probs, price_changes, tree_method,
-                         int_rate, int_rates_tree, volatility, dividents, is_put, is_american)
+                         int_rate, int_rates_tree, volatility, dividents, is_put, is_american, smoothing,
+                         divident_schedule, dtype)
         """
         Set up the parameters that are needed for the model
 
@@ -22,5 +26,15 @@ class BinomialCRROption(BinomialTreeOption):
         :attr qd: Risk-free probability to the downstate
         """
 
-        self.u = math.exp(self.volatility * math.sqrt(self.dt))
-        self.d = 1 / self.u
+        self.u, self.d = self.calc_price_changes()
+
+    def calc_price_changes(self, volatility=None, int_rate=None, strike=None, maturity=None, initial_price=None):
+        """
+        Returns the price changes u = exp(volatility * sqrt(dt)) and d = 1 / u.
+        The parameters default to those of the option and can be arrays. Without a maturity,
+        the time step of the tree is used, which a roll keeps while the maturity decays.
+        """
+        volatility = self.volatility if volatility is None else volatility
+        dt = self.dt if maturity is None else maturity / self.steps
+        u = np.exp(volatility * np.sqrt(dt))
+        return u, 1 / u
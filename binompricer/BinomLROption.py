@@ -1,4 +1,4 @@
-import math
+import numpy as np
 from .BinomTreeOption import BinomialTreeOption
 
 
@@ -7,13 +7,16 @@ class BinomialLROption(BinomialTreeOption):
     """
     Price an option with the Leisen - Reimer tree
     """
+    convergence_order = 2
+    odd_steps = True
 
     def __init__(self, strike, maturity, initial_price, price_tree=None, steps=2,
                  probs=(0.5, 0.5), price_changes=(None, None), tree_method='multiply',
                  int_rate=0.05, int_rates_tree=None, volatility=0, dividents=0,
-                 is_put=False, is_american=False):
+                 is_put=False, is_american=False, smoothing=None, divident_schedule=None, dtype=float):
         super().__init__(strike, maturity, initial_price, price_tree, steps, probs, price_changes, tree_method,
-                         int_rate, int_rates_tree, volatility, dividents, is_put, is_american)
+                         int_rate, int_rates_tree, volatility, dividents, is_put, is_american, smoothing,
+                         divident_schedule, dtype)
         """
         Set up the parameters that are needed for the model
 
@@ -23,23 +26,44 @@ class BinomialLROption(BinomialTreeOption):
         :attr qd: Risk-free probability to the downstate
         """
 
+        self.u, self.d = self.calc_price_changes()
+        dr = np.exp((self.int_rate - self.dividents) * self.dt)
+        self.p = (dr - self.d) / (self.u - self.d)
+        self.qu = self.p
+        self.qd = 1 - self.p
+
+    def calc_price_changes(self, volatility=None, int_rate=None, strike=None, maturity=None, initial_price=None):
+        """
+        Returns the price changes u and d of the Leisen - Reimer tree, centred on the strike.
+        The parameters default to those of the option and can be arrays. Without a maturity,
+        the tree spans its steps at the time step of the tree, which a roll keeps while the maturity decays.
+        """
+        volatility = self.volatility if volatility is None else volatility
+        int_rate = self.int_rate if int_rate is None else int_rate
+        strike = self.strike if strike is None else strike
+        initial_price = self.initial_price if initial_price is None else initial_price
+        if maturity is None:
+            dt, maturity = self.dt, self.dt * self.steps
+        else:
+            dt = maturity / self.steps
+
         odd_steps = self.steps if (self.steps % 1 == 0) else (self.steps + 1)
-        df = math.exp(-(self.int_rate - self.dividents) * self.dt)
+        df = np.exp(-(int_rate - self.dividents) * dt)
 
-        term_1 = math.log(self.initial_price / self.strike)
-        term_21 = (self.int_rate - self.dividents) * self.maturity
-        term_22 = (self.volatility ** 2 / 2) * self.maturity
-        term_3 = self.volatility * math.sqrt(self.maturity)
+        # The tree is centred on the initial price net of the escrowed dividends
+        term_1 = np.log((initial_price - self.escrowed_dividends(0, int_rate)) / strike)
+        term_21 = (int_rate - self.dividents) * maturity
+        term_22 = (volatility ** 2 / 2) * maturity
+        term_3 = volatility * np.sqrt(maturity)
 
         d1 = (term_1 + term_21 + term_22) / term_3
         d2 = (term_1 + term_21 - term_22) / term_3
 
         pbar = self.pp_inversion(d1, odd_steps)
-        self.p = self.pp_inversion(d2, odd_steps)
-        self.u = 1 / df * pbar / self.p
-        self.d = (1 / df - self.p * self.u) / (1 - self.p)
-        self.qu = self.p
-        self.qd = 1 - self.p
+        p = self.pp_inversion(d2, odd_steps)
+        u = 1 / df * pbar / p
+        d = (1 / df - p * u) / (1 - p)
+        return u, d
 
     @staticmethod
     def pp_inversion(z, n):
@@ -47,4 +71,4 @@ class BinomialLROption(BinomialTreeOption):
         Peizer and Pratt inversion formula
         """
         exponent = - (z / (n + 1/3 + 0.1 / (n + 1))) ** 2 * (n + 1/6)
-        return 0.5 + math.copysign(1, z) * math.sqrt(0.25 - 0.25 * math.exp(exponent))
+        return 0.5 + np.sign(z) * np.sqrt(0.25 - 0.25 * np.exp(exponent))
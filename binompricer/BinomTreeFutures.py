@@ -1,5 +1,7 @@
 from .StockFutures import StockFutures
-from .Stock import Stock
+from .Lattice import TriangularLattice
+from . import Profiling
+import numpy as np
 
 
 class BinomialTreeFutures(StockFutures):
@@ -9,10 +11,10 @@ class BinomialTreeFutures(StockFutures):
     """
     def __init__(self, initial_price=None, price_tree=None, maturity=1, steps=2,
                  probs=(0.5, 0.5), price_changes=(None, None), tree_method='multiply',
-                 int_rate=0.05, int_rates_tree=None, volatility=0, dividents=0):
+                 int_rate=0.05, int_rates_tree=None, volatility=0, dividents=0, dtype=float):
         super().__init__(initial_price, price_tree, maturity, steps,
                          probs, price_changes, tree_method,
-                         int_rate, int_rates_tree, volatility, dividents)
+                         int_rate, int_rates_tree, volatility, dividents, dtype)
         """
         Set up the parameters that are needed for the model
 
@@ -37,22 +39,45 @@ class BinomialTreeFutures(StockFutures):
         """
         Traverses binomial tree
         """
-        self.futures_tree = [futures_prices]
+        self.futures_tree = TriangularLattice(self.steps, dtype=self.dtype)
+        self.futures_tree[self.steps] = futures_prices
+        factors = self.step_factors(self.steps, discounted=False) if self.has_constant_params else None
         for n in reversed(range(self.steps)):
             # Backwards formula
-            futures_prices = (self.risk_free_probs_up[n] * futures_prices[:-1]
-                              + self.risk_free_probs_down[n] * futures_prices[1:])
-            self.futures_tree.append(futures_prices)
+            next_prices, futures_prices = self.futures_tree[n + 1], self.futures_tree[n]
+            up, down = (self.risk_free_probs_up[n], self.risk_free_probs_down[n]) if factors is None else factors[n]
+            np.multiply(up, next_prices[:-1], out=futures_prices)
+            futures_prices += down * next_prices[1:]
 
-    def price(self):
+    def price(self, cache=None):
         """
         Entry point of the pricing implementation
+        :param cache: PricingCache in which the premium and the lattices are looked up and stored
+        """
+        if cache is not None:
+            return cache.price(self)
+        self.calc_lattices()
+        return self.price_from_lattices()
+
+    def update_spot(self, initial_price):
+        """
+        Reprices the contract for a new initial price of the stock. If the contract has been
+        priced, the price tree is rescaled in place and only the backward induction runs again.
+        :param initial_price: new value of the stock at time t=0
+        :return: premium of the contract
+        """
+        self.update_price_tree(initial_price)
+        if self.price_tree is None:
+            return self.price()
+        return self.price_from_lattices()
+
+    def price_from_lattices(self):
+        """
+        Runs the backward induction over the price tree and the
+        risk-neutral probabilities, which have to be calculated
         """
-        self.calc_price_tree()
-        self.calc_interest_factors()
-        self.calc_risk_neutral_probs()
         futures_prices = self.init_futures_tree()
-        self.traverse_tree(futures_prices)
-        self.premium = self.futures_tree[-1].item()
+        Profiling.run_phase('traverse_tree', self.traverse_tree, futures_prices)
+        self.premium = self.futures_tree[0].item()
 
         return self.premium
@@ -1,4 +1,9 @@
 from .StockOption import StockOption
+from .Lattice import TriangularLattice, ConstantLattice, level_factors
+from .BlackScholes import bs_price
+from .Batch import price_trees
+from . import Kernels
+from . import Profiling
 import numpy as np
 
 
@@ -6,17 +11,34 @@ class BinomialTreeOption(StockOption):
     """
     Price a European or American option by the binomial tree
     """
+    # Order of convergence of European premiums in the number of steps, if known,
+    # whether the tree converges best with an odd number of steps, and whether
+    # the premium oscillates between odd and even steps
+    convergence_order = None
+    odd_steps = False
+    odd_even_oscillation = False
+    fold_discounts = True
 
     def __init__(self, strike, maturity, initial_price=None, price_tree=None, steps=2,
                  probs=(None, None), price_changes=(None, None), tree_method='multiply',
                  int_rate=0.05, int_rates_tree=None, volatility=0, dividents=0,
-                 is_put=False, is_american=False):
+                 is_put=False, is_american=False, smoothing=None, divident_schedule=None, dtype=float):
         super().__init__(strike, maturity, initial_price, price_tree, steps, probs, price_changes, tree_method,
-                         int_rate, int_rates_tree, volatility, dividents, is_put, is_american)
+                         int_rate, int_rates_tree, volatility, dividents, is_put, is_american, divident_schedule,
+                         dtype)
 
         """
         Set up the parameters that are needed for the model
+        :param smoothing: None to start the backward induction from the payoffs at maturity,
+                          'bbs' to replace the last step with the Black-Scholes value (Binomial Black-Scholes)
         """
+        if smoothing not in (None, 'bbs'):
+            raise ValueError("Smoothing can only be None or 'bbs'.")
+        if smoothing == 'bbs' and (self.tree_method != 'multiply' or int_rates_tree is not None
+                                   or not self.volatility > 0):
+            raise ValueError("The 'bbs' smoothing needs a 'multiply' tree with a constant 'int_rate'"
+                             " and a positive 'volatility'.")
+        self.smoothing = smoothing
         self.hedge_ratios = []
         self.payoff_tree = []
         self.premium = 0
@@ -30,6 +52,27 @@ class BinomialTreeOption(StockOption):
         else:
             return np.maximum(0, self.strike - self.price_tree[self.steps])
 
+    def smoothed_payoffs(self, prices):
+        """
+        Returns the payoffs one step before maturity, with the Black-Scholes value
+        of the option over the last step in place of the binomial expectation.
+        The Black-Scholes value is that of the price net of the escrowed dividends.
+        """
+        payoffs = bs_price(prices - self.escrowed_dividends(self.steps - 1), self.strike, self.dt, self.int_rate,
+                           self.volatility, self.dividents, not self.is_call).astype(self.dtype)
+        if not self.is_european:
+            if self.is_call:
+                payoffs = np.maximum(payoffs, prices - self.strike)
+            else:
+                payoffs = np.maximum(payoffs, self.strike - prices)
+        return payoffs
+
+    def start_level(self):
+        """
+        Returns the last level of the tree that the backward induction calculates
+        """
+        return self.steps - 1 if self.smoothing == 'bbs' else self.steps
+
     def check_early_exercise(self, payoffs, node):
         """
         Check if it's worth exercising now
@@ -44,39 +87,403 @@ class BinomialTreeOption(StockOption):
         Starting from the time of maturity, traverse backwards
         and calculate discounted payoffs at each node
         """
-        payoffs = self.init_payoffs_tree()
-        self.payoff_tree = [payoffs]
-        for i in reversed(range(self.steps)):
+        self.payoff_tree = TriangularLattice(self.steps, dtype=self.dtype)
+        self.payoff_tree[self.steps] = self.init_payoffs_tree()
+        start = self.start_level()
+        if start < self.steps:
+            self.payoff_tree[start] = self.smoothed_payoffs(self.price_tree[start])
+        payoffs = self.payoff_tree[start]
+        if not self.is_european and Kernels.use_compiled():
+            self.traverse_tree_compiled()
+            return self.payoff_tree
+
+        factors = self.step_factors(start) if self.has_constant_params else None
+        for i in reversed(range(start)):
+            next_payoffs, payoffs = payoffs, self.payoff_tree[i]
             # The payoffs from not exercising the option
-            payoffs = (self.discounts[i] * (payoffs[:-1] * self.risk_free_probs_up[i]
-                                            + payoffs[1:] * self.risk_free_probs_down[i]))
+            if factors is None:
+                discount = self.discounts[i]
+                up, down = self.risk_free_probs_up[i] * discount, self.risk_free_probs_down[i] * discount
+            else:
+                up, down = factors[i]
+            np.multiply(next_payoffs[:-1], up, out=payoffs)
+            payoffs += next_payoffs[1:] * down
             # Payoffs from exercising, for American options
             if not self.is_european:
-                payoffs = self.check_early_exercise(payoffs, i)
-            self.payoff_tree.append(payoffs)
-        self.payoff_tree = self.payoff_tree[::-1]
+                payoffs[:] = self.check_early_exercise(payoffs, i)
         return self.payoff_tree
 
-    def price(self):
+    def traverse_tree_compiled(self):
+        """
+        Backward induction for American options with the compiled kernel,
+        which fuses discounting, the expectation and the early exercise in place.
+        The payoffs at the start level have to be set.
+        """
+        def packed(lattice):
+            if isinstance(lattice, ConstantLattice):
+                return np.array([lattice.value], dtype=self.dtype)
+            return lattice.data
+
+        if self.has_constant_params:
+            # The discounted probabilities of every level, and no separate discounts
+            factors = self.step_factors(self.start_level())
+            probs_up, probs_down = np.ascontiguousarray(factors[:, 0]), np.ascontiguousarray(factors[:, 1])
+            discounts = np.ones(1, dtype=self.dtype)
+        else:
+            probs_up, probs_down = packed(self.risk_free_probs_up), packed(self.risk_free_probs_down)
+            discounts = packed(self.discounts)
+        Kernels.american_backward_induction(self.payoff_tree.data, self.price_tree.data, self.payoff_tree.offsets,
+                                            probs_up, probs_down, discounts, self.has_constant_params,
+                                            isinstance(self.discounts, ConstantLattice) or self.has_constant_params,
+                                            self.dtype.type(self.strike), self.dtype.type(1 if self.is_call else -1),
+                                            self.start_level())
+
+    def traverse_tree_lean(self):
+        """
+        Traverses the tree backwards keeping only the current level of payoffs, in one buffer.
+        Stock prices, interest factors and risk-neutral probabilities are calculated
+        level by level, so the memory needed is linear in the number of steps.
+        Trees with constant parameters are rolled back by the compiled kernel of the batch pricing, if used.
+        """
+        escrow = self.escrowed_dividends(np.arange(self.steps + 1))
+        if self.has_constant_params and Kernels.use_compiled():
+            return price_trees([self.initial_price], self.u, self.d, self.int_rate, self.dividents, self.dt,
+                               self.strike, self.steps, not self.is_call, not self.is_european, self.volatility,
+                               self.smoothing, escrow[:, None] if self.divident_schedule else None, self.dtype)
+
+        start = self.start_level()
+        prices_next = self.price_level(start, escrow)
+        payoffs = np.empty(start + 1, dtype=self.dtype)
+        if start < self.steps:
+            payoffs[:] = self.smoothed_payoffs(prices_next)
+        elif self.is_call:
+            np.maximum(prices_next - self.strike, 0, out=payoffs)
+        else:
+            np.maximum(self.strike - prices_next, 0, out=payoffs)
+        buffer = np.empty_like(payoffs)
+
+        if self.has_constant_params:
+            dr = self.interest_factor_level(0)
+            probs_up = float((dr - self.d) / (self.u - self.d))
+            factors = level_factors((probs_up, 1 - probs_up), 1 / dr, start, self.dtype)
+            # The stock prices net of the escrowed dividends are rolled back in place, for early exercise
+            net_prices = prices_next - escrow[start]
+            inverse_u = 1 / self.dtype.type(self.u)
+        for i in reversed(range(start)):
+            if self.has_constant_params:
+                up, down = factors[i]
+            else:
+                # The probabilities are those of the tree net of the escrowed dividends
+                prices = self.price_level(i, escrow)
+                dr = self.interest_factor_level(i)
+                prices_up, prices_down = prices_next[:-1] - escrow[i + 1], prices_next[1:] - escrow[i + 1]
+                probs_up = ((prices - escrow[i]) * dr - prices_down) / (prices_up - prices_down)
+                up, down = probs_up / dr, (1 - probs_up) / dr
+                prices_next = prices
+            # The payoffs of the level overwrite the first nodes of the next level
+            next_payoffs, payoffs, temp = payoffs, payoffs[:i + 1], buffer[:i + 1]
+            np.multiply(next_payoffs[1:i + 2], down, out=temp)
+            payoffs *= up
+            payoffs += temp
+            if not self.is_european:
+                if self.has_constant_params:
+                    net_prices = net_prices[:i + 1]
+                    net_prices *= inverse_u
+                    prices = net_prices + escrow[i] if self.divident_schedule else net_prices
+                if self.is_call:
+                    np.subtract(prices, self.strike, out=temp)
+                else:
+                    np.subtract(self.strike, prices, out=temp)
+                np.maximum(payoffs, temp, out=payoffs)
+        return payoffs
+
+    def price(self, premium_only=False, cache=None):
         """
         Entry point of the pricing implementation
+        :param premium_only: if True, only the premium is calculated and the price, interest
+                             and payoff trees are not stored. The trees are needed for the
+                             calculation of the hedge ratios.
+        :param cache: PricingCache in which the premium and the lattices are looked up and stored
+        """
+        if cache is not None:
+            return cache.price(self, premium_only)
+        self.hedge_ratios = []
+        if premium_only:
+            self.payoff_tree = []
+            self.premium = Profiling.run_phase('traverse_tree_lean', self.traverse_tree_lean)[0].item()
+            return self.premium
+
+        self.calc_lattices()
+        return self.price_from_lattices()
+
+    def price_from_lattices(self):
+        """
+        Runs the backward induction over the price tree, interest factors
+        and risk-neutral probabilities, which have to be calculated
         """
-        self.calc_price_tree()
-        self.calc_interest_factors()
-        self.calc_risk_neutral_probs()
-        payoffs = self.traverse_tree()
+        self.hedge_ratios = []
+        payoffs = Profiling.run_phase('traverse_tree', self.traverse_tree)
         # Option value at time 0 converges to first node
         self.premium = payoffs[0].item()
 
         return self.premium
 
-    def calc_hedge_ratios(self):
+    def price_control_variate(self):
+        """
+        Prices an American option with the European option on the same tree as a control variate.
+        The American and European payoffs are rolled back together in one pass over the price tree,
+        and the error of the European premium of the tree against its Black-Scholes premium is taken
+        off the American premium, which removes most of the discretization error of the tree.
+        The payoff tree is not stored.
+        :return: corrected premium of the option; the Black-Scholes premium for a European option
+        """
+        if not self.has_constant_params or not self.volatility > 0:
+            raise ValueError("The control variate needs a 'multiply' tree with a constant 'int_rate'"
+                             " and a positive 'volatility'.")
+        self.hedge_ratios = []
+        self.payoff_tree = []
+        sign = 1. if self.is_call else -1.
+        is_put = not self.is_call
+        # The tree spans steps * dt, which after a roll differs from the maturity within the tolerance
+        maturity = self.maturity if self.is_european else self.steps * self.dt
+        analytic = bs_price(self.initial_price - self.escrowed_dividends(0), self.strike, maturity,
+                            self.int_rate, self.volatility, self.dividents, is_put).item()
+        if self.is_european:
+            self.premium = analytic
+            return self.premium
+
+        self.calc_lattices()
+        start = self.start_level()
+        prices = self.price_tree[start]
+        if start < self.steps:
+            european = bs_price(prices - self.escrowed_dividends(start), self.strike, self.dt, self.int_rate,
+                                self.volatility, self.dividents, is_put).astype(self.dtype)
+        else:
+            european = np.maximum(0, sign * (prices - self.strike))
+        american = np.maximum(european, sign * (prices - self.strike))
+
+        factors = self.step_factors(start)
+        disc_up, disc_down = np.ascontiguousarray(factors[:, 0]), np.ascontiguousarray(factors[:, 1])
+        if Kernels.use_compiled():
+            Kernels.control_variate_backward_induction(american, european, self.price_tree.data,
+                                                       self.price_tree.offsets, disc_up, disc_down,
+                                                       self.dtype.type(self.strike), self.dtype.type(sign), start)
+            tree_american, tree_european = american[0], european[0]
+        else:
+            # The American payoffs are the first row and the European the second, rolled back in place
+            payoffs = np.stack([american, european])
+            buffer = np.empty_like(payoffs)
+            for i in reversed(range(start)):
+                next_payoffs, payoffs, temp = payoffs, payoffs[:, :i + 1], buffer[:, :i + 1]
+                np.multiply(next_payoffs[:, 1:i + 2], disc_down[i], out=temp)
+                payoffs *= disc_up[i]
+                payoffs += temp
+                np.maximum(payoffs[0], sign * (self.price_tree[i] - self.strike), out=payoffs[0])
+            tree_american, tree_european = payoffs[0, 0], payoffs[1, 0]
+
+        self.premium = (tree_american + analytic - tree_european).item()
+        return self.premium
+
+    def update_spot(self, initial_price):
+        """
+        Reprices the option for a new initial price of the stock. If the option has been
+        priced with its trees, the price tree is rescaled in place, the interest factors and
+        risk-neutral probabilities are reused, and only the backward induction runs again.
+        Models whose price changes depend on the initial price, like Leisen - Reimer,
+        are priced from scratch.
+        :param initial_price: new value of the stock at time t=0
+        :return: premium of the option
+        """
+        self.update_price_tree(initial_price)
+        u, d = self.calc_price_changes()
+        if u != self.u or d != self.d:
+            self.u, self.d = u, d
+            self.price_tree = None
+        if self.price_tree is None:
+            return self.price()
+        return self.price_from_lattices()
+
+    def roll(self, elapsed, tol=1e-3):
+        """
+        Reprices the option after its time to maturity has decayed, reusing the stored trees.
+        The levels before the new root are dropped and the time step is kept, as long as it drifts
+        from the time step of a tree for the new maturity by less than tol. If the new root is at
+        the initial price, the payoffs from it on are reused; otherwise the price tree is moved to
+        the initial price and only the backward induction runs again. Beyond the tolerance, or if the
+        option has not been priced with its trees, the trees are rebuilt with the current steps.
+        :param elapsed: time passed since the last pricing
+        :param tol: tolerance on the relative drift of the time step
+        :return: premium of the option
+        """
+        if self.tree_method == 'direct':
+            raise ValueError("A price tree that is given directly cannot be rolled.")
+        maturity = self.maturity - elapsed
+        # The escrowed dividends change as dividends are paid, so trees with a divident schedule are rebuilt
+        anchor = None
+        if self.price_tree is not None and self.payoff_tree and not self.divident_schedule:
+            anchor = self.roll_anchor(maturity, tol)
+        self.maturity = maturity
+        self.divident_schedule = [(time - elapsed, amount) for time, amount in self.divident_schedule
+                                  if time > elapsed]
+        if anchor is None:
+            self.dt = self.maturity / float(self.steps)
+            self.u, self.d = self.calc_price_changes()
+            self.price_tree = None
+            return self.price()
+
+        level, node, at_initial_price = anchor
+        initial_price = self.initial_price
+        self.roll_lattices(level, node)
+        if at_initial_price:
+            self.initial_price = initial_price
+            self.hedge_ratios = []
+            self.payoff_tree = self.payoff_tree.subtree(level, node, in_place=True)
+            self.premium = self.payoff_tree[0][0].item()
+            return self.premium
+        self.update_price_tree(initial_price)
+        return self.price_from_lattices()
+
+    def price_batch(self, strikes, is_put=None, is_american=None, with_deltas=False):
+        """
+        Prices a chain of options written on the same underlying tree.
+        The price tree, interest factors and risk-neutral probabilities are
+        calculated once and the backward induction runs over a 2D
+        (contracts x nodes) array.
+        :param strikes: array of strike prices
+        :param is_put: array of put flags, defaults to the flag of the option
+        :param is_american: array of American flags, defaults to the flag of the option
+        :param with_deltas: if True, the deltas, the hedge ratios at the first node, are also returned.
+                            With the 'bbs' smoothing, they need at least 2 steps.
+        :return: array of premiums, one per contract, and the array of deltas if with_deltas is True
+        """
+        strikes = np.atleast_1d(np.asarray(strikes, dtype=self.dtype))
+        if is_put is None:
+            is_put = not self.is_call
+        if is_american is None:
+            is_american = not self.is_european
+        is_put = np.broadcast_to(np.asarray(is_put, dtype=bool), strikes.shape)
+        is_american = np.broadcast_to(np.asarray(is_american, dtype=bool), strikes.shape)
+        start = self.start_level()
+        # The 'bbs' smoothing replaces the first level of payoffs of a single step, which the deltas are read from
+        if with_deltas and start == 0:
+            raise ValueError("The deltas of a 'bbs' tree need at least 2 steps.")
+
+        self.calc_lattices()
+
+        # Signed payoffs: (S - K) for calls and (K - S) for puts
+        sign = np.where(is_put, -1., 1.).astype(self.dtype)[:, None]
+        strikes = strikes[:, None]
+        any_american = is_american.any()
+        american = is_american[:, None]
+
+        if start < self.steps:
+            prices = self.price_tree[start]
+            payoffs = bs_price(prices - self.escrowed_dividends(start), strikes, self.dt, self.int_rate,
+                               self.volatility, self.dividents, is_put[:, None]).astype(self.dtype)
+            payoffs = np.where(american, np.maximum(payoffs, sign * (prices - strikes)), payoffs)
+        else:
+            payoffs = np.maximum(0, sign * (self.price_tree[self.steps] - strikes))
+        deltas = None
+        if start == 1 and with_deltas:
+            deltas = self.first_deltas(payoffs)
+        factors = self.step_factors(start) if self.has_constant_params else None
+        for i in reversed(range(start)):
+            if factors is None:
+                payoffs = (self.discounts[i] * (payoffs[:, :-1] * self.risk_free_probs_up[i]
+                                                + payoffs[:, 1:] * self.risk_free_probs_down[i]))
+            else:
+                payoffs = payoffs[:, :-1] * factors[i, 0] + payoffs[:, 1:] * factors[i, 1]
+            if any_american:
+                exercise = sign * (self.price_tree[i] - strikes)
+                payoffs = np.where(american, np.maximum(payoffs, exercise), payoffs)
+            if i == 1 and with_deltas:
+                deltas = self.first_deltas(payoffs)
+
+        if with_deltas:
+            return payoffs[:, 0], deltas
+        return payoffs[:, 0]
+
+    def first_deltas(self, payoffs):
+        """
+        Returns the hedge ratios at the first node for a 2D (contracts x nodes) array of payoffs at step 1
+        """
+        return (payoffs[:, 0] - payoffs[:, 1]) / (self.price_tree[1][0] - self.price_tree[1][1])
+
+    def calc_price_changes(self, volatility=None, int_rate=None, strike=None, maturity=None, initial_price=None):
+        """
+        Returns the price changes (u, d) of the tree for the given parameters,
+        which default to those of the option. The price changes of the base tree
+        are given at initialisation, so they do not depend on them.
+        """
+        return self.u, self.d
+
+    def greeks(self, vol_bump=0.01, rate_bump=0.0001):
+        """
+        Calculates the sensitivities of the premium.
+        Delta, gamma and theta are read from the first levels of the payoff and price trees.
+        Vega and rho are central differences of one batch of bumped trees, and are only
+        calculated for 'multiply' trees with a constant interest rate. Vega also needs price changes
+        that depend on the volatility, as those of the CRR and Leisen - Reimer trees.
+        :param vol_bump: bump of the volatility for vega
+        :param rate_bump: bump of the interest rate for rho
+        :return: dictionary with the delta, gamma, theta, vega and rho of the option
+        """
+        if self.steps < 2:
+            raise ValueError("The greeks need a tree with at least 2 steps.")
+        if not self.payoff_tree:
+            self.price()
+        values, prices = self.payoff_tree, self.price_tree
+
+        delta = (values[1][0] - values[1][1]) / (prices[1][0] - prices[1][1])
+        delta_up = (values[2][0] - values[2][1]) / (prices[2][0] - prices[2][1])
+        delta_down = (values[2][1] - values[2][2]) / (prices[2][1] - prices[2][2])
+        gamma = (delta_up - delta_down) / ((prices[2][0] - prices[2][2]) / 2)
+        # The middle node two steps ahead is at the initial price only if u * d = 1,
+        # so the change of the price is corrected for with delta and gamma
+        price_change = prices[2][1] - prices[0][0]
+        theta = (values[2][1] - values[0][0] - delta * price_change
+                 - gamma * price_change ** 2 / 2) / (2 * self.dt)
+        greeks = {'delta': delta.item(), 'gamma': gamma.item(), 'theta': theta.item(), 'vega': None, 'rho': None}
+
+        if self.has_constant_params:
+            # The price changes of the base tree are given, so they do not depend on the volatility
+            with_vega = type(self).calc_price_changes is not BinomialTreeOption.calc_price_changes
+            vol_bumps, rate_bumps = ([1, -1, 0, 0], [0, 0, 1, -1]) if with_vega else ([0, 0], [1, -1])
+            volatility = self.volatility + vol_bump * np.array(vol_bumps)
+            int_rate = self.int_rate + rate_bump * np.array(rate_bumps)
+            u, d = self.calc_price_changes(volatility=volatility, int_rate=int_rate)
+            escrow = self.escrowed_dividends(np.arange(self.steps + 1), int_rate) if self.divident_schedule else None
+            premiums = price_trees(self.initial_price, u, d, int_rate, self.dividents, self.dt, self.strike,
+                                   self.steps, not self.is_call, not self.is_european, volatility, self.smoothing,
+                                   escrow, self.dtype)
+            if with_vega:
+                greeks['vega'] = ((premiums[0] - premiums[1]) / (2 * vol_bump)).item()
+            greeks['rho'] = ((premiums[-2] - premiums[-1]) / (2 * rate_bump)).item()
+
+        return greeks
+
+    def calc_hedge_ratios(self, levels=None):
         """
-        Calculates the hedge ratios as every node of the tree
+        Calculates the hedge ratios at every node of the tree, in one pass over the packed
+        payoff and price trees. The hedge ratios are cached until the option is priced again.
+        :param levels: number of time steps to calculate the hedge ratios for, defaults to all of them
         """
-        for i in range(1, len(self.payoff_tree)):
-            dw = self.payoff_tree[i][1:] - self.payoff_tree[i][:-1]
-            ds = self.price_tree[i][1:] - self.price_tree[i][:-1]
-            self.hedge_ratios.append(np.divide(dw, ds))
+        if not self.payoff_tree:
+            raise ValueError("The hedge ratios need the payoff tree. Price the option with 'premium_only=False'.")
+        levels = self.steps if levels is None else levels
+        if not 1 <= levels <= self.steps:
+            raise ValueError("The levels of the hedge ratios have to be between 1 and 'steps'.")
+
+        offsets = self.payoff_tree.offsets
+        if len(self.hedge_ratios) < levels:
+            nodes = offsets[levels + 1]
+            dw = np.diff(self.payoff_tree.data[:nodes])
+            ds = np.diff(self.price_tree.data[:nodes])
+            # Drop the differences between the last node of a level and the first node of the next
+            within_level = np.ones(nodes - 1, dtype=bool)
+            within_level[offsets[1:levels + 1] - 1] = False
+            self.hedge_ratios = TriangularLattice(levels - 1, dw[within_level] / ds[within_level])
 
+        if len(self.hedge_ratios) > levels:
+            return TriangularLattice(levels - 1, self.hedge_ratios.data[:offsets[levels]])
         return self.hedge_ratios
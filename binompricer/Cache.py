@@ -0,0 +1,155 @@
+from collections import OrderedDict
+
+from .Lattice import TriangularLattice
+from .StockOption import StockOption
+
+
+class PricingCache(object):
+    """
+    Least recently used cache of premiums and lattices.
+    Premiums are keyed on the contract and market parameters, and the price tree,
+    interest factors and risk-neutral probabilities on the parameters of the tree,
+    so contracts on the same underlying and tree shape share one set of lattices.
+    Float parameters are rounded, so that parameters that differ only by
+    floating point noise share an entry. Trees that are given directly or
+    have an interest rates tree are priced without the cache.
+    Cached lattices and payoff trees are read-only, as they are shared between contracts.
+    """
+
+    def __init__(self, maxsize=1024, max_lattices=32, precision=10):
+        """
+        :param maxsize: maximum number of cached premiums
+        :param max_lattices: maximum number of cached sets of lattices
+        :param precision: number of decimals the float parameters are rounded to
+
+        :attr hits: number of premiums found in the cache
+        :attr misses: number of premiums that were calculated
+        :attr lattice_hits: number of premiums calculated on cached lattices
+        :attr lattice_misses: number of premiums for which the lattices were calculated
+        """
+        if maxsize < 1 or max_lattices < 1:
+            raise ValueError("The sizes of the cache have to be at least one.")
+        self.maxsize = maxsize
+        self.max_lattices = max_lattices
+        self.precision = precision
+        self._premiums = OrderedDict()
+        self._lattices = OrderedDict()
+        self.hits, self.misses = 0, 0
+        self.lattice_hits, self.lattice_misses = 0, 0
+
+    def __len__(self):
+        return len(self._premiums)
+
+    def __repr__(self):
+        return (f"PricingCache(hits={self.hits}, misses={self.misses}, lattice_hits={self.lattice_hits}, "
+                f"lattice_misses={self.lattice_misses}, size={len(self)}/{self.maxsize})")
+
+    def clear(self):
+        """
+        Empties the cache and resets the counters
+        """
+        self._premiums.clear()
+        self._lattices.clear()
+        self.hits, self.misses = 0, 0
+        self.lattice_hits, self.lattice_misses = 0, 0
+
+    def round(self, value):
+        """
+        Rounds a float parameter for a key; other parameters are returned as they are
+        """
+        if value is None or isinstance(value, (bool, str)):
+            return value
+        return round(float(value), self.precision)
+
+    def lattice_key(self, contract):
+        """
+        Returns the key of the lattices of a contract, or None if they cannot be cached
+        """
+        if contract.tree_method == 'direct' or contract.int_rates_tree is not None:
+            return None
+        schedule = tuple((self.round(time), self.round(amount)) for time, amount in contract.divident_schedule)
+        return (contract.tree_method, contract.steps, schedule, contract.dtype) + tuple(
+            self.round(value) for value in (contract.initial_price, contract.u, contract.d, contract.maturity,
+                                            contract.int_rate, contract.dividents))
+
+    def premium_key(self, contract, lattice_key):
+        """
+        Returns the key of the premium of a contract
+        """
+        if not isinstance(contract, StockOption):
+            return type(contract), lattice_key
+        return (type(contract), lattice_key, self.round(contract.strike), contract.is_call, contract.is_european,
+                getattr(contract, 'smoothing', None), self.round(contract.volatility))
+
+    @staticmethod
+    def lookup(entries, key):
+        """
+        Returns the entry of a key, marking it as the most recently used, or None
+        """
+        entry = entries.get(key)
+        if entry is not None:
+            entries.move_to_end(key)
+        return entry
+
+    @staticmethod
+    def store(entries, key, entry, maxsize):
+        """
+        Stores an entry, evicting the least recently used ones beyond maxsize
+        """
+        entries[key] = entry
+        entries.move_to_end(key)
+        while len(entries) > maxsize:
+            entries.popitem(last=False)
+
+    def price(self, contract, premium_only=False):
+        """
+        Prices an option or futures contract, using the cached premium or lattices if available.
+        On a miss, the backward induction runs over the lattices even with premium_only=True,
+        since they are cached. With premium_only=False, the payoff tree of an option is cached
+        along with the premium and the lattices, so that its hedge ratios and greeks can be
+        calculated after a hit.
+        :param contract: BinomialTreeOption or BinomialTreeFutures
+        :param premium_only: True if only the premium is needed
+        :return: premium of the contract
+        """
+        is_option = isinstance(contract, StockOption)
+        lattice_key = self.lattice_key(contract)
+        if lattice_key is None:
+            return contract.price(premium_only) if is_option else contract.price()
+        key = self.premium_key(contract, lattice_key)
+
+        entry = self.lookup(self._premiums, key)
+        if entry is not None and (premium_only or entry[1] is not None):
+            self.hits += 1
+            contract.premium, tree, lattices = entry
+            if lattices is not None:
+                contract.lattices = lattices
+            if is_option:
+                contract.hedge_ratios = []
+                contract.payoff_tree = [] if premium_only else tree
+            else:
+                contract.futures_tree = tree
+            return contract.premium
+
+        self.misses += 1
+        lattices = self.lookup(self._lattices, lattice_key)
+        if lattices is None:
+            self.lattice_misses += 1
+            contract.calc_lattices()
+            lattices = contract.lattices
+            for lattice in lattices:
+                if isinstance(lattice, TriangularLattice):
+                    lattice.data.flags.writeable = False
+            self.store(self._lattices, lattice_key, lattices, self.max_lattices)
+        else:
+            self.lattice_hits += 1
+            contract.lattices = lattices
+
+        premium = contract.price_from_lattices()
+        if is_option and premium_only:
+            tree, lattices, contract.payoff_tree = None, None, []
+        else:
+            tree = contract.payoff_tree if is_option else contract.futures_tree
+            tree.data.flags.writeable = False
+        self.store(self._premiums, key, (premium, tree, lattices), self.maxsize)
+        return premium
@@ -0,0 +1,247 @@
+"""
+Command-line entry point that prices a file of contracts.
+Contracts are read from a CSV or Parquet file in chunks, priced with the vectorized engine, and
+written with their premiums and deltas as each chunk is priced, so the memory needed does not
+grow with the size of the file. Contracts that share a tree within a chunk are priced together,
+so files sorted by underlying are priced fastest. Progress is reported on stderr.
+
+    binompricer contracts.csv -o premiums.csv --chunk-size 100000 --workers 4
+
+The columns are the contract parameters of the portfolio pricer (see Portfolio.SPEC_DTYPE):
+model, underlying, tree_method, initial_price, maturity, steps, int_rate, volatility, dividents,
+u, d, pu, pd, strike, is_put and is_american. The initial_price and maturity of every contract, and
+the strike of options, are required; other empty values take the default of the pricing class, with
+'tree' as the model and 'multiply' as the tree method. Other columns, like a trade identifier,
+are copied to the output.
+Parquet files need pyarrow (pip install PyBinomPricer[parquet]).
+"""
+import argparse
+import csv
+import sys
+import time
+
+import numpy as np
+
+from .Portfolio import PortfolioPricer, SPEC_DTYPE, pack_columns
+
+# Columns that are packed into the contract specifications
+SPEC_COLUMNS = set(SPEC_DTYPE.names)
+BOOL_COLUMNS = ('is_put', 'is_american')
+# Text columns with the values that empty cells take
+TEXT_COLUMNS = {'model': 'tree', 'tree_method': 'multiply', 'underlying': ''}
+TRUE_VALUES = ('1', 'true', 't', 'yes', 'y')
+# Parameters without a default, and the one that only options need
+REQUIRED_COLUMNS = ('initial_price', 'maturity')
+OPTION_COLUMNS = ('strike',)
+
+
+def is_parquet(path):
+    """
+    True if the file is read or written as Parquet
+    """
+    return path.lower().endswith(('.parquet', '.pq'))
+
+
+def parse_column(name, values):
+    """
+    Converts a column of CSV strings to the type of its contract parameter
+    """
+    values = np.asarray(values, dtype=str)
+    if name in TEXT_COLUMNS:
+        values = np.char.strip(values)
+        return np.where(values == '', TEXT_COLUMNS[name], values)
+    if name in BOOL_COLUMNS:
+        return np.isin(np.char.lower(np.char.strip(values)), TRUE_VALUES)
+    numbers = np.where(np.char.strip(values) == '', 'nan', values).astype(float)
+    if name == 'steps':
+        return np.where(np.isnan(numbers), 2, numbers).astype(int)
+    return numbers
+
+
+def check_header(header):
+    """
+    Raises a ValueError if columns of required parameters are missing
+    """
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ValueError(f"The input has no column for the required parameters: {', '.join(missing)}.")
+
+
+def read_csv(path, chunk_size):
+    """
+    Yields the chunks of a CSV file as dictionaries of columns of strings.
+    Blank lines are skipped.
+    """
+    with (sys.stdin if path == '-' else open(path, newline='')) as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError("The input is empty.")
+        check_header(header)
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) != len(header):
+                raise ValueError(f"Line {reader.line_num} has {len(row)} values for {len(header)} columns.")
+            rows.append(row)
+            if len(rows) == chunk_size:
+                yield dict(zip(header, map(np.array, zip(*rows))))
+                rows = []
+        if rows:
+            yield dict(zip(header, map(np.array, zip(*rows))))
+
+
+def read_parquet(path, chunk_size):
+    """
+    Yields the batches of a Parquet file as dictionaries of columns
+    """
+    import pyarrow.parquet as pq
+
+    file = pq.ParquetFile(path)
+    check_header(file.schema_arrow.names)
+    for batch in file.iter_batches(batch_size=chunk_size):
+        yield {name: column.to_numpy(zero_copy_only=False) for name, column in zip(batch.schema.names, batch.columns)}
+
+
+def spec_columns(chunk):
+    """
+    Returns the columns of a chunk that are contract parameters, converted to their types
+    """
+    columns = {}
+    for name, values in chunk.items():
+        if name not in SPEC_COLUMNS:
+            continue
+        if values.dtype == object:
+            # Nulls of Parquet columns are empty values
+            values = parse_column(name, ['' if value is None else str(value) for value in values])
+        elif values.dtype.kind in 'US':
+            values = parse_column(name, values)
+        elif name == 'steps':
+            values = np.where(np.isnan(values), 2, values).astype(int) if values.dtype.kind == 'f' else values
+        columns[name] = values
+    return columns
+
+
+def check_values(columns, first_row):
+    """
+    Raises a ValueError for the first contract of a chunk without a required parameter
+    :param columns: contract parameters of the chunk, as returned by spec_columns
+    :param first_row: number of the first contract of the chunk in the input, starting from one
+    """
+    size = len(next(iter(columns.values())))
+    is_option = columns['model'] != 'futures' if 'model' in columns else np.ones(size, dtype=bool)
+    for name in REQUIRED_COLUMNS + OPTION_COLUMNS:
+        values = columns.get(name, np.full(size, np.nan))
+        missing = np.isnan(values) & is_option if name in OPTION_COLUMNS else np.isnan(values)
+        if missing.any():
+            raise ValueError(f"Contract {first_row + np.argmax(missing)} has no value for '{name}'.")
+
+
+class CsvWriter(object):
+    """
+    Writes priced chunks to a CSV file, or to stdout for '-'
+    """
+
+    def __init__(self, path):
+        self.file = sys.stdout if path == '-' else open(path, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.header = None
+
+    def write(self, chunk):
+        if self.header is None:
+            self.header = list(chunk)
+            self.writer.writerow(self.header)
+        self.writer.writerows(zip(*(chunk[name].tolist() for name in self.header)))
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+class ParquetWriter(object):
+    """
+    Writes priced chunks to a Parquet file, one row group per chunk
+    """
+
+    def __init__(self, path):
+        import pyarrow
+        import pyarrow.parquet as pq
+
+        self.pyarrow, self.pq = pyarrow, pq
+        self.path = path
+        self.writer = None
+
+    def write(self, chunk):
+        table = self.pyarrow.table(chunk)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def price_file(input_path, output_path, chunk_size=100000, workers=1, with_deltas=True, log=sys.stderr):
+    """
+    Prices the contracts of a CSV or Parquet file chunk by chunk
+    :param input_path: CSV or Parquet file of contracts, or '-' for CSV on stdin
+    :param output_path: CSV or Parquet file for the priced contracts, or '-' for CSV on stdout
+    :param chunk_size: number of contracts read, priced and written at a time
+    :param workers: number of worker processes
+    :param with_deltas: if True, the deltas are written along with the premiums
+    :param log: stream for the progress, or None
+    :return: number of contracts priced
+    """
+    if chunk_size < 1:
+        raise ValueError("The chunk size has to be at least one.")
+    chunks = read_parquet(input_path, chunk_size) if is_parquet(input_path) else read_csv(input_path, chunk_size)
+    writer = ParquetWriter(output_path) if is_parquet(output_path) else CsvWriter(output_path)
+    start = time.perf_counter()
+    priced = 0
+    try:
+        with PortfolioPricer(max_workers=workers) as pricer:
+            for chunk in chunks:
+                columns = spec_columns(chunk)
+                check_values(columns, priced + 1)
+                result = pricer.price(pack_columns(columns), with_deltas)
+                if with_deltas:
+                    chunk['premium'], chunk['delta'] = result
+                else:
+                    chunk['premium'] = result
+                writer.write(chunk)
+                priced += len(chunk['premium'])
+                if log is not None:
+                    elapsed = time.perf_counter() - start
+                    print(f"{priced} contracts priced in {elapsed:.1f}s ({priced / elapsed:.0f} contracts/s)",
+                          file=log, flush=True)
+    finally:
+        writer.close()
+    return priced
+
+
+def main(argv=None):
+    """
+    Entry point of the 'binompricer' command
+    """
+    parser = argparse.ArgumentParser(prog='binompricer', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help="CSV or Parquet file of contracts, or '-' for CSV on stdin")
+    parser.add_argument('-o', '--output', default='-', help="CSV or Parquet output file, or '-' for CSV on stdout")
+    parser.add_argument('--chunk-size', type=int, default=100000, help='contracts priced at a time')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--no-deltas', action='store_true', help='write the premiums only')
+    parser.add_argument('--quiet', action='store_true', help='do not report the progress on stderr')
+    args = parser.parse_args(argv)
+
+    try:
+        price_file(args.input, args.output, args.chunk_size, args.workers, not args.no_deltas,
+                   None if args.quiet else sys.stderr)
+    except (ValueError, OSError, ImportError) as error:
+        parser.exit(1, f"binompricer: error: {error}\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
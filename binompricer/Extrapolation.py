@@ -0,0 +1,100 @@
+class RichardsonOption(object):
+    """
+    Accelerates the convergence of an option price in the number of steps,
+    by Richardson extrapolation of the prices of two trees.
+    American and smoothed premiums converge at first order, European ones at the order of the model.
+    Models that oscillate with the steps, like CRR, do not have a leading error term to eliminate,
+    as their error depends on where the strike falls between the nodes. They are priced with the
+    'bbs' smoothing, which removes the oscillation.
+    """
+
+    def __init__(self, option_class, steps=50, tol=None, max_steps=10000, **kwargs):
+        """
+        :param option_class: pricing class with a convergence order, e.g. BinomialCRROption or BinomialLROption
+        :param steps: steps of the coarser tree
+        :param tol: target error; if specified, the steps are doubled until the error estimate falls below it
+        :param max_steps: maximum steps of the finer tree when a target error is specified
+        :param kwargs: keyword arguments of the pricing class, except for steps.
+                       The smoothing of oscillating models defaults to 'bbs', and cannot be None.
+
+        :attr premium: extrapolated premium
+        :attr error: estimated error, the difference between the extrapolated and the finer tree premium
+                     after a single extrapolation, and then twice the largest difference between
+                     successive premiums of the last three extrapolations
+        :attr steps_pair: steps of the coarser and finer tree of the last extrapolation
+        :attr nodes: total number of tree nodes used
+        """
+        if getattr(option_class, 'convergence_order', None) is None:
+            raise ValueError("Richardson extrapolation needs an option class with a known convergence order.")
+        self.option_class = option_class
+        if option_class.odd_even_oscillation:
+            kwargs.setdefault('smoothing', 'bbs')
+            if kwargs['smoothing'] is None:
+                raise ValueError("Richardson extrapolation of an oscillating model needs the 'bbs' smoothing.")
+        smoothed = kwargs.get('smoothing') is not None
+        self.order = 1 if kwargs.get('is_american', False) or smoothed else option_class.convergence_order
+        self.steps = steps
+        self.tol = tol
+        self.max_steps = max_steps
+        self.kwargs = kwargs
+
+        self.premium = 0
+        self.error = None
+        self.steps_pair = None
+        self.nodes = 0
+
+    def first_steps(self):
+        """
+        Returns the steps of the coarsest tree, with the parity the model converges best with
+        """
+        if self.option_class.odd_steps:
+            return self.steps if self.steps % 2 == 1 else self.steps + 1
+        return self.steps if self.steps % 2 == 0 else self.steps + 1
+
+    def next_steps(self, steps):
+        """
+        Returns the steps of the next finer tree, keeping their parity
+        """
+        return 2 * steps + 1 if self.option_class.odd_steps else 2 * steps
+
+    def tree_price(self, steps):
+        """
+        Prices the option with a tree of the given steps
+        """
+        self.nodes += (steps + 1) * (steps + 2) // 2
+        return self.option_class(steps=steps, **self.kwargs).price(premium_only=True)
+
+    def extrapolate(self, coarse_steps, coarse_price, fine_steps, fine_price):
+        """
+        Eliminates the leading error term, assumed to be proportional to steps^(-order)
+        """
+        coarse_weight, fine_weight = coarse_steps ** self.order, fine_steps ** self.order
+        return (fine_weight * fine_price - coarse_weight * coarse_price) / (fine_weight - coarse_weight)
+
+    def price(self):
+        """
+        Entry point of the pricing implementation
+        """
+        self.nodes = 0
+        coarse_steps = self.first_steps()
+        coarse_price = self.tree_price(coarse_steps)
+        premiums = []
+        while True:
+            fine_steps = self.next_steps(coarse_steps)
+            fine_price = self.tree_price(fine_steps)
+            self.premium = self.extrapolate(coarse_steps, coarse_price, fine_steps, fine_price)
+            premiums.append(self.premium)
+            self.steps_pair = (coarse_steps, fine_steps)
+            if len(premiums) == 1:
+                self.error = abs(self.premium - fine_price)
+            else:
+                # What is left of the error after the extrapolation can still oscillate with the steps,
+                # e.g. with the position of the strike between the nodes, so two successive premiums
+                # can agree by chance. Twice the larger of the last two differences bounds the error.
+                last = premiums[-3:]
+                self.error = 2 * max(abs(b - a) for a, b in zip(last, last[1:]))
+            if self.tol is None or self.error <= self.tol or self.next_steps(fine_steps) > self.max_steps:
+                break
+            coarse_steps, coarse_price = fine_steps, fine_price
+
+        return self.premium
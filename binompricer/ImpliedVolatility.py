@@ -0,0 +1,111 @@
+import math
+
+import numpy as np
+
+from .BinomTreeOption import BinomialTreeOption
+from .BinomCRROption import BinomialCRROption
+from .Batch import price_trees
+
+
+def corrado_miller_guess(market_prices, strikes, maturities, initial_price, int_rate, dividents, is_put):
+    """
+    Corrado - Miller approximation of the implied volatility, used as a starting point.
+    Put prices are converted to call prices with the put-call parity.
+    Falls back to the Brenner - Subrahmanyam approximation when the formula has no real solution.
+    """
+    spot = initial_price * np.exp(-dividents * maturities)
+    strike_pv = strikes * np.exp(-int_rate * maturities)
+    call_prices = np.where(is_put, market_prices + spot - strike_pv, market_prices)
+
+    half_moneyness = (spot - strike_pv) / 2
+    discriminant = (call_prices - half_moneyness) ** 2 - (spot - strike_pv) ** 2 / math.pi
+    guess = (np.sqrt(2 * math.pi / maturities) / (spot + strike_pv)
+             * (call_prices - half_moneyness + np.sqrt(np.maximum(discriminant, 0))))
+    fallback = np.sqrt(2 * math.pi / maturities) * call_prices / spot
+    return np.where(discriminant >= 0, guess, fallback)
+
+
+def implied_volatility(market_prices, strikes, maturities, initial_price, int_rate=0.05, dividents=0,
+                       is_put=False, is_american=False, steps=100, model=BinomialCRROption, smoothing=None,
+                       tol=1e-6, max_iter=50, vol_bounds=(0.01, 5.), vol_bump=1e-4):
+    """
+    Implied volatilities of options on the same underlying. At every iteration, the trees
+    of all the unsolved options are priced in one vectorized backward induction.
+    Newton steps use the tree vega, from trees with bumped volatilities at the first
+    iteration and from the last two iterations afterwards. The steps are taken within
+    a bracket of the solution, and bisection is used when a step leaves the bracket.
+    :param market_prices: array of option prices
+    :param strikes: array of strike prices
+    :param maturities: array of times to maturity
+    :param initial_price: value of the stock at time t=0
+    :param int_rate: risk-free interest rate
+    :param dividents: divident yield
+    :param is_put: array of put flags
+    :param is_american: array of American flags
+    :param steps: steps of the trees
+    :param model: pricing class whose price changes depend on the volatility, e.g. BinomialCRROption
+    :param smoothing: None, or 'bbs' for the Binomial Black-Scholes smoothing
+    :param tol: tolerance on the difference between the tree and the market price
+    :param max_iter: maximum number of iterations
+    :param vol_bounds: bracket of the implied volatilities
+    :param vol_bump: volatility bump for the tree vega
+    :return: array of implied volatilities, NaN where no solution is found in the bracket
+    """
+    if model.calc_price_changes is BinomialTreeOption.calc_price_changes:
+        raise ValueError("The implied volatility needs a model whose price changes depend on the volatility.")
+    market_prices, strikes, maturities, is_put, is_american = np.broadcast_arrays(
+        np.asarray(market_prices, dtype=float), np.asarray(strikes, dtype=float),
+        np.asarray(maturities, dtype=float), np.asarray(is_put, dtype=bool), np.asarray(is_american, dtype=bool))
+    shape = market_prices.shape
+    market_prices, strikes, maturities, is_put, is_american = [
+        np.ravel(param) for param in (market_prices, strikes, maturities, is_put, is_american)]
+
+    # Prototype option, whose price changes are evaluated for arrays of volatilities, strikes and maturities
+    prototype = model(strike=strikes[0], maturity=maturities[0], initial_price=initial_price, steps=steps,
+                      int_rate=int_rate, volatility=vol_bounds[1], dividents=dividents)
+
+    def tree_prices(volatilities, indices):
+        u, d = prototype.calc_price_changes(volatility=volatilities, strike=strikes[indices],
+                                            maturity=maturities[indices])
+        return price_trees(initial_price, u, d, int_rate, dividents, maturities[indices] / steps,
+                           strikes[indices], steps, is_put[indices], is_american[indices], volatilities, smoothing)
+
+    lower = np.full(len(market_prices), vol_bounds[0])
+    upper = np.full(len(market_prices), vol_bounds[1])
+    vols = corrado_miller_guess(market_prices, strikes, maturities, initial_price, int_rate, dividents, is_put)
+    vols = np.clip(np.nan_to_num(vols, nan=0.3), *vol_bounds)
+    previous_vols = vols + vol_bump
+    previous_errors = np.full(len(market_prices), np.nan)
+
+    active = np.arange(len(market_prices))
+    for iteration in range(max_iter):
+        if len(active) == 0:
+            break
+        n = len(active)
+        if iteration == 0:
+            # The first slope is the tree vega, from trees with bumped volatilities
+            prices = tree_prices(np.concatenate((vols[active], previous_vols[active])),
+                                 np.concatenate((active, active)))
+            previous_errors[active] = prices[n:] - market_prices[active]
+        else:
+            # Then the slope is the tree vega between the last two iterations
+            prices = tree_prices(vols[active], active)
+        errors = prices[:n] - market_prices[active]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            vegas = (previous_errors[active] - errors) / (previous_vols[active] - vols[active])
+
+        converged = np.abs(errors) < tol
+        # Tighten the bracket around the solution
+        lower[active] = np.where(errors < 0, vols[active], lower[active])
+        upper[active] = np.where(errors > 0, vols[active], upper[active])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = vols[active] - errors / vegas
+        bisection = (lower[active] + upper[active]) / 2
+        in_bracket = (newton > lower[active]) & (newton < upper[active])
+        previous_vols[active], previous_errors[active] = vols[active], errors
+        vols[active] = np.where(converged, vols[active], np.where(in_bracket, newton, bisection))
+        active = active[~converged]
+
+    vols[active] = np.nan
+    return vols.reshape(shape)
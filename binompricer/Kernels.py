@@ -0,0 +1,132 @@
+"""
+Compiled kernels for the backward induction of the binomial tree.
+The kernels are compiled with numba, when it is installed. Otherwise,
+the pricing classes fall back to their NumPy implementation.
+"""
+try:
+    import numba
+except ImportError:
+    numba = None
+
+HAS_NUMBA = numba is not None
+BACKENDS = ('numpy', 'numba')
+_backend = 'numba' if HAS_NUMBA else 'numpy'
+
+
+def get_backend():
+    """
+    Returns the name of the backend used for the American backward induction
+    """
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Sets the backend used for the American backward induction
+    :param backend: 'numba' for the compiled kernel, 'numpy' for the NumPy implementation
+    """
+    global _backend
+    if backend not in BACKENDS:
+        raise ValueError("The backend can only be 'numpy' or 'numba'.")
+    if backend == 'numba' and not HAS_NUMBA:
+        raise ValueError("The 'numba' backend needs numba to be installed.")
+    _backend = backend
+
+
+def use_compiled():
+    """
+    True if the compiled kernels are used
+    """
+    return _backend == 'numba'
+
+
+def american_backward_induction(payoffs, prices, offsets, probs_up, probs_down, discounts,
+                                constant_probs, constant_discounts, strike, sign, steps):
+    """
+    Backward induction for an American option over packed lattices.
+    Discounting, the expectation under the risk-neutral probabilities and the
+    early exercise are fused in one loop, which writes the payoffs in place.
+    :param payoffs: packed payoff lattice, with the payoffs at maturity already set
+    :param prices: packed stock price lattice
+    :param offsets: offsets of the levels in the packed lattices
+    :param probs_up: packed risk-neutral probabilities to the up-state
+    :param probs_down: packed risk-neutral probabilities to the down-state
+    :param discounts: packed discount factors
+    :param constant_probs: if True, probs_up and probs_down hold one value per level
+    :param constant_discounts: if True, discounts holds a single value
+    :param strike: strike price
+    :param sign: 1 for a call option, -1 for a put option
+    :param steps: number of steps of the tree
+    """
+    qu, qd, discount = probs_up[0], probs_down[0], discounts[0]
+    for i in range(steps - 1, -1, -1):
+        offset, next_offset = offsets[i], offsets[i + 1]
+        if constant_probs:
+            qu, qd = probs_up[i], probs_down[i]
+        for j in range(i + 1):
+            node = offset + j
+            if not constant_probs:
+                qu, qd = probs_up[node], probs_down[node]
+            if not constant_discounts:
+                discount = discounts[node]
+            continuation = discount * (qu * payoffs[next_offset + j] + qd * payoffs[next_offset + j + 1])
+            exercise = sign * (prices[node] - strike)
+            payoffs[node] = continuation if continuation > exercise else exercise
+
+
+def control_variate_backward_induction(american, european, prices, offsets, disc_up, disc_down, strike, sign, start):
+    """
+    Fused backward induction of an American option and the European option with the same
+    terms, on a tree with constant risk-neutral probabilities. The payoffs of both options are
+    rolled back in place, in one loop over the nodes.
+    :param american: payoffs of the American option at the start level, overwritten
+    :param european: payoffs of the European option at the start level, overwritten
+    :param prices: packed stock price lattice
+    :param offsets: offsets of the levels in the packed lattices
+    :param disc_up: discounted risk-neutral probabilities to the up-state, one per level
+    :param disc_down: discounted risk-neutral probabilities to the down-state, one per level
+    :param strike: strike price
+    :param sign: 1 for a call option, -1 for a put option
+    :param start: level of the payoffs the backward induction starts from
+    """
+    for i in range(start - 1, -1, -1):
+        offset, qu, qd = offsets[i], disc_up[i], disc_down[i]
+        for j in range(i + 1):
+            european[j] = qu * european[j] + qd * european[j + 1]
+            continuation = qu * american[j] + qd * american[j + 1]
+            exercise = sign * (prices[offset + j] - strike)
+            american[j] = continuation if continuation > exercise else exercise
+
+
+def batch_backward_induction(payoffs, prices, inverse_u, factors, exercise_sign, exercise_strike, escrow, start):
+    """
+    Backward induction of a batch of options, each on its own tree with constant parameters.
+    Trees are along the first axis of the 2D arrays and nodes along the second, and the trees are
+    rolled back one at a time, so that the nodes of a tree stay in cache. The stock prices of each
+    level are rolled back from the next level, and both arrays are overwritten in place.
+    :param payoffs: payoffs at the start level, overwritten
+    :param prices: stock prices net of the escrowed dividends at the start level, overwritten
+    :param inverse_u: inverse of the factor of the price change to the up-state of every tree
+    :param factors: discounted risk-neutral probabilities to the up- and down-state, (levels x 2 x trees)
+    :param exercise_sign: 1 for American calls, -1 for American puts and 0 for European options
+    :param exercise_strike: exercise_sign times the strike, and infinity for European options
+    :param escrow: escrowed dividends of every level and tree
+    :param start: level of the payoffs the backward induction starts from
+    """
+    for k in range(payoffs.shape[0]):
+        tree_payoffs, tree_prices, sign, strike = payoffs[k], prices[k], exercise_sign[k], exercise_strike[k]
+        for i in range(start - 1, -1, -1):
+            qu, qd, level_escrow = factors[i, 0, k], factors[i, 1, k], escrow[i, k]
+            for j in range(i + 1):
+                price = tree_prices[j] * inverse_u[k]
+                tree_prices[j] = price
+                continuation = qu * tree_payoffs[j] + qd * tree_payoffs[j + 1]
+                exercise = sign * (price + level_escrow) - strike
+                tree_payoffs[j] = continuation if continuation > exercise else exercise
+
+
+if HAS_NUMBA:
+    # The kernels release the GIL, so that other threads, like an event loop, run while they do
+    american_backward_induction = numba.njit(cache=True, nogil=True)(american_backward_induction)
+    control_variate_backward_induction = numba.njit(cache=True, nogil=True)(control_variate_backward_induction)
+    batch_backward_induction = numba.njit(cache=True, nogil=True)(batch_backward_induction)
@@ -0,0 +1,251 @@
+import numpy as np
+
+
+def level_factors(weights, factor, levels, dtype=float):
+    """
+    Returns the weights multiplied by a factor, e.g. the risk-neutral probabilities times the discount
+    of a step, for the levels 0, ..., levels - 1 of a backward induction, in the given floating point type.
+    Rounded to single precision, the same factors at every level would bias a premium by about one
+    rounding error per level. The rounding error of the sum of the factors of a level is instead carried
+    into the factors of the level rolled back after it, so that the product of the sums over the levels
+    stays within a few rounding errors of factor ** levels.
+    :param weights: sequence of weights, or an array with a column per tree
+    :param factor: factor of the weights, or an array with one per tree
+    :param levels: number of levels
+    :param dtype: floating point type of the factors
+    :return: array with one row of factors per level
+    """
+    exact = np.asarray(weights, dtype=float) * factor
+    dtype = np.dtype(dtype)
+    if dtype == np.float64:
+        return np.broadcast_to(exact, (levels,) + exact.shape)
+    factors = np.empty((levels,) + exact.shape, dtype=dtype)
+    target = exact.sum(axis=0)
+    correction = np.ones(target.shape)
+    for i in reversed(range(levels)):
+        factors[i] = exact * correction
+        correction *= target / factors[i].sum(axis=0, dtype=float)
+    return factors
+
+
+class TriangularLattice(object):
+    """
+    Recombining tree stored in a single contiguous array.
+    Level n of the tree has n + 1 nodes, stored in data[offsets[n]:offsets[n] + n + 1].
+    Indexing with a level returns a view of that level, so the lattice
+    can be used in place of a list of arrays.
+    """
+    # Number of nodes that a level has more than the level before it
+    level_growth = 1
+
+    def __init__(self, steps, data=None, dtype=float):
+        """
+        Initializes a lattice with levels 0, 1, ..., steps
+        :param steps: last level of the lattice
+        :param data: contiguous array with the nodes of all levels.
+                     If not provided, an uninitialized array is allocated
+        :param dtype: data type of the nodes
+        """
+        if steps < 0:
+            raise ValueError("The lattice needs at least one level.")
+        self.steps = steps
+        self.offsets = self.level_offsets(steps)
+        if data is None:
+            data = np.empty(self.offsets[-1], dtype=dtype)
+        elif len(data) != self.offsets[-1]:
+            raise ValueError("The number of nodes does not match a recombining tree with this number of steps.")
+        self.data = data
+
+    @staticmethod
+    def level_offsets(steps):
+        """
+        Returns the positions of the first node of the levels 0, 1, ..., steps + 1 in the data array
+        """
+        levels = np.arange(steps + 2)
+        return levels * (levels + 1) // 2
+
+    @classmethod
+    def level_size(cls, n):
+        """
+        Returns the number of nodes of level n
+        """
+        return cls.level_growth * n + 1
+
+    @classmethod
+    def from_levels(cls, levels, dtype=float):
+        """
+        Builds a lattice from a sequence of levels
+        :param levels: sequence of arrays, the n-th of which has n + 1 nodes
+        :param dtype: data type of the nodes
+        """
+        if isinstance(levels, cls):
+            return levels
+        for i, array in enumerate(levels):
+            if len(array) != cls.level_size(i):
+                raise ValueError("Assuming the tree is recombining, the number of nodes should start from one"
+                                 f" and increase by {'one' if cls.level_growth == 1 else 'two'}.")
+        lattice = cls(len(levels) - 1, dtype=dtype)
+        for i, array in enumerate(levels):
+            lattice[i][:] = array
+        return lattice
+
+    @classmethod
+    def full(cls, steps, value, dtype=float):
+        """
+        Builds a lattice with every node equal to value
+        """
+        return cls(steps, np.full(cls.level_offsets(steps)[-1], value, dtype=dtype))
+
+    def level_slice(self, n):
+        """
+        Returns the slice of the data array that holds level n
+        """
+        if n < 0:
+            n += self.steps + 1
+        if n < 0 or n > self.steps:
+            raise IndexError("Lattice level out of range.")
+        return slice(self.offsets[n], self.offsets[n + 1])
+
+    def __getitem__(self, n):
+        if isinstance(n, slice):
+            return [self[i] for i in range(*n.indices(len(self)))]
+        return self.data[self.level_slice(n)]
+
+    def __setitem__(self, n, values):
+        self.data[self.level_slice(n)] = values
+
+    def __len__(self):
+        return self.steps + 1
+
+    def __iter__(self):
+        for n in range(self.steps + 1):
+            yield self.data[self.offsets[n]:self.offsets[n + 1]]
+
+    def __repr__(self):
+        return f"TriangularLattice(steps={self.steps}, dtype={self.data.dtype})"
+
+    def tolist(self):
+        """
+        Returns the lattice as a list of lists
+        """
+        return [level.tolist() for level in self]
+
+    def subtree(self, level, node, in_place=False):
+        """
+        Returns the nodes that can be reached from a node, as a lattice rooted at that node
+        :param level: level of the root node
+        :param node: position of the root node in its level
+        :param in_place: if True, the nodes are moved to the front of the data array,
+                         which the subtree then shares, instead of being copied.
+                         Read-only data is always copied.
+        """
+        if not (0 <= level <= self.steps and 0 <= node < self.level_size(level)):
+            raise IndexError("Lattice node out of range.")
+        steps = self.steps - level
+        offsets = self.level_offsets(steps)
+        if in_place and self.data.flags.writeable:
+            # Every level moves towards the front, so the levels are moved in increasing order
+            data = self.data
+        else:
+            data = np.empty(offsets[-1], dtype=self.data.dtype)
+        for n in range(steps + 1):
+            start, target, size = self.offsets[level + n] + node, offsets[n], self.level_size(n)
+            data[target:target + size] = self.data[start:start + size]
+        return type(self)(steps, data[:offsets[-1]])
+
+    def upper_nodes(self):
+        """
+        Returns the nodes of every level except the lowest one, in one flat array.
+        These are the up-state children of the nodes of a lattice with one level less.
+        """
+        mask = np.ones(len(self.data), dtype=bool)
+        mask[self.offsets[1:] - 1] = False
+        return self.data[mask]
+
+    def lower_nodes(self):
+        """
+        Returns the nodes of every level except the highest one, in one flat array.
+        These are the down-state children of the nodes of a lattice with one level less.
+        """
+        mask = np.ones(len(self.data), dtype=bool)
+        mask[self.offsets[:-1]] = False
+        return self.data[mask]
+
+
+class TrinomialLattice(TriangularLattice):
+    """
+    Recombining trinomial tree stored in a single contiguous array.
+    Level n of the tree has 2n + 1 nodes, stored in data[offsets[n]:offsets[n] + 2n + 1].
+    The children of node j at level n are the nodes j, j + 1 and j + 2 at level n + 1.
+    """
+    level_growth = 2
+
+    @staticmethod
+    def level_offsets(steps):
+        """
+        Returns the positions of the first node of the levels 0, 1, ..., steps + 1 in the data array
+        """
+        return np.arange(steps + 2) ** 2
+
+    def __repr__(self):
+        return f"TrinomialLattice(steps={self.steps}, dtype={self.data.dtype})"
+
+    def upper_nodes(self):
+        """
+        Not defined, as the nodes of a trinomial lattice have three children
+        """
+        raise TypeError("The nodes of a trinomial lattice have three children; index its levels instead.")
+
+    def lower_nodes(self):
+        """
+        Not defined, as the nodes of a trinomial lattice have three children
+        """
+        raise TypeError("The nodes of a trinomial lattice have three children; index its levels instead.")
+
+
+class ConstantLattice(object):
+    """
+    Recombining tree with the same value at every node.
+    Indexing a level returns the value as a scalar, which broadcasts
+    against the levels of other lattices, so no nodes are stored.
+    """
+
+    def __init__(self, steps, value):
+        """
+        :param steps: last level of the lattice
+        :param value: value at every node
+        """
+        self.steps = steps
+        self.value = value
+
+    def __getitem__(self, n):
+        if n < -self.steps - 1 or n > self.steps:
+            raise IndexError("Lattice level out of range.")
+        return self.value
+
+    def __len__(self):
+        return self.steps + 1
+
+    def __iter__(self):
+        for n in range(self.steps + 1):
+            yield self.value
+
+    def subtree(self, level, node, in_place=False):
+        """
+        Returns the lattice of the nodes that can be reached from a node
+        :param level: level of the root node
+        :param node: position of the root node in its level
+        :param in_place: unused, as no nodes are stored
+        """
+        if not 0 <= node <= level <= self.steps:
+            raise IndexError("Lattice node out of range.")
+        return ConstantLattice(self.steps - level, self.value)
+
+    def __repr__(self):
+        return f"ConstantLattice(steps={self.steps}, value={self.value})"
+
+    def tolist(self):
+        """
+        Returns the lattice as a list of lists
+        """
+        return [[self.value] * (n + 1) for n in range(self.steps + 1)]
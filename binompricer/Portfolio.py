@@ -0,0 +1,274 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+import numpy as np
+from numpy.lib.recfunctions import repack_fields
+
+from .BinomTreeOption import BinomialTreeOption
+from .BinomCRROption import BinomialCRROption
+from .BinomLROption import BinomialLROption
+from .BinomTreeFutures import BinomialTreeFutures
+
+MODELS = {'tree': BinomialTreeOption, 'crr': BinomialCRROption,
+          'lr': BinomialLROption, 'futures': BinomialTreeFutures}
+TREE_METHODS = ('multiply', 'add')
+
+# Contract specifications travel to the workers as rows of a structured array.
+# Float parameters that are NaN take the default value of the pricing class.
+SPEC_DTYPE = np.dtype([('underlying', 'i8'), ('model', 'i1'), ('tree_method', 'i1'),
+                       ('initial_price', 'f8'), ('maturity', 'f8'), ('steps', 'i8'),
+                       ('int_rate', 'f8'), ('volatility', 'f8'), ('dividents', 'f8'),
+                       ('u', 'f8'), ('d', 'f8'), ('pu', 'f8'), ('pd', 'f8'),
+                       ('strike', 'f8'), ('is_put', '?'), ('is_american', '?')])
+# Fields that do not change the tree, so contracts that differ only in them share one tree
+CONTRACT_FIELDS = ('strike', 'is_put', 'is_american')
+TREE_FIELDS = [name for name in SPEC_DTYPE.names if name not in CONTRACT_FIELDS]
+
+
+def pack_specs(specs):
+    """
+    Packs contract specifications into a structured array
+    :param specs: sequence of dictionaries with the keyword arguments of the pricing class
+                  and the keys 'model' ('tree', 'crr', 'lr' or 'futures', default 'tree')
+                  and 'underlying' (any hashable, default: contracts are grouped by tree parameters)
+    :return: structured array with dtype SPEC_DTYPE
+    """
+    records = np.zeros(len(specs), dtype=SPEC_DTYPE)
+    for name in ('initial_price', 'maturity', 'int_rate', 'volatility', 'dividents',
+                 'u', 'd', 'pu', 'pd', 'strike'):
+        records[name] = np.nan
+    records['steps'] = 2
+    underlyings = {}
+
+    for record, spec in zip(records, specs):
+        spec = dict(spec)
+        model = spec.pop('model', 'tree')
+        if model not in MODELS:
+            raise ValueError("The model can only be 'tree', 'crr', 'lr' or 'futures'.")
+        record['model'] = list(MODELS).index(model)
+        tree_method = spec.pop('tree_method', 'multiply')
+        if tree_method not in TREE_METHODS:
+            raise ValueError("Only the 'multiply' and 'add' tree methods can be priced in a portfolio.")
+        record['tree_method'] = TREE_METHODS.index(tree_method)
+        if spec.get('price_tree') is not None or spec.get('int_rates_tree') is not None:
+            raise ValueError("Contracts with a 'price_tree' or an 'int_rates_tree' cannot be priced in a portfolio.")
+        spec.pop('price_tree', None)
+        spec.pop('int_rates_tree', None)
+
+        underlying = spec.pop('underlying', None)
+        record['underlying'] = underlyings.setdefault(underlying, len(underlyings)) if underlying is not None else -1
+        record['u'], record['d'] = spec.pop('price_changes', (np.nan, np.nan))
+        record['pu'], record['pd'] = spec.pop('probs', (np.nan, np.nan))
+        for name, value in spec.items():
+            if name not in SPEC_DTYPE.names:
+                raise ValueError(f"Unknown contract parameter '{name}'.")
+            record[name] = value
+    return records
+
+
+def pack_columns(columns):
+    """
+    Packs columns of contract specifications into a structured array, without a loop over the contracts
+    :param columns: dictionary of equal length arrays, named after the fields of SPEC_DTYPE, with
+                    'model' and 'tree_method' as names and 'underlying' as any labels,
+                    where empty labels are no underlying.
+                    Missing or NaN float parameters take the default value of the pricing class.
+    :return: structured array with dtype SPEC_DTYPE
+    """
+    size = len(next(iter(columns.values()))) if columns else 0
+    records = np.zeros(size, dtype=SPEC_DTYPE)
+    for name in ('initial_price', 'maturity', 'int_rate', 'volatility', 'dividents',
+                 'u', 'd', 'pu', 'pd', 'strike'):
+        records[name] = np.nan
+    records['steps'] = 2
+    records['underlying'] = -1
+
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if name == 'model':
+            models = np.array(list(MODELS))
+            if not np.isin(values, models).all():
+                raise ValueError("The model can only be 'tree', 'crr', 'lr' or 'futures'.")
+            order = np.argsort(models)
+            records['model'] = order[np.searchsorted(models[order], values)]
+        elif name == 'tree_method':
+            if not np.isin(values, TREE_METHODS).all():
+                raise ValueError("Only the 'multiply' and 'add' tree methods can be priced in a portfolio.")
+            records['tree_method'] = values == TREE_METHODS[1]
+        elif name == 'underlying':
+            labels = values.astype(str)
+            records['underlying'] = np.where(labels == '', -1, np.unique(labels, return_inverse=True)[1])
+        elif name in SPEC_DTYPE.names:
+            records[name] = values
+        else:
+            raise ValueError(f"Unknown contract parameter '{name}'.")
+    return records
+
+
+def unpack_spec(record):
+    """
+    Returns the pricing class and its keyword arguments for a packed contract specification
+    """
+    model = list(MODELS)[record['model']]
+    kwargs = {'steps': int(record['steps']), 'tree_method': TREE_METHODS[record['tree_method']]}
+    for name in ('initial_price', 'maturity', 'int_rate', 'volatility', 'dividents'):
+        if not np.isnan(record[name]):
+            kwargs[name] = float(record[name])
+    if model == 'futures':
+        if not np.isnan(record['u']):
+            kwargs['price_changes'], kwargs['probs'] = (record['u'], record['d']), (None, None)
+        elif not np.isnan(record['pu']):
+            kwargs['probs'] = (record['pu'], record['pd'])
+        return MODELS[model], kwargs
+
+    kwargs.update(strike=float(record['strike']), is_put=bool(record['is_put']),
+                  is_american=bool(record['is_american']))
+    if model == 'tree':
+        if not np.isnan(record['u']):
+            kwargs['price_changes'] = (record['u'], record['d'])
+        if not np.isnan(record['pu']):
+            kwargs['probs'] = (record['pu'], record['pd'])
+    return MODELS[model], kwargs
+
+
+def price_records(records, with_deltas=False):
+    """
+    Prices packed contract specifications. Options that share a tree,
+    except for Leisen-Reimer trees which depend on the strike, are priced together.
+    :param records: structured array with dtype SPEC_DTYPE
+    :param with_deltas: if True, the deltas of the contracts are also returned
+    :return: array of premiums, and the array of deltas if with_deltas is True
+    """
+    premiums = np.empty(len(records))
+    deltas = np.empty(len(records))
+    groups = {}
+    for i, key in enumerate(tree_keys(records)):
+        groups.setdefault(key, []).append(i)
+
+    for indices in groups.values():
+        indices = np.array(indices)
+        model, kwargs = unpack_spec(records[indices[0]])
+        if model is BinomialTreeFutures:
+            contract = model(**kwargs)
+            premiums[indices] = contract.price()
+            if with_deltas:
+                futures, prices = contract.futures_tree, contract.price_tree
+                deltas[indices] = (futures[1][0] - futures[1][1]) / (prices[1][0] - prices[1][1])
+        elif model is BinomialLROption:
+            for i in indices:
+                model, kwargs = unpack_spec(records[i])
+                contract = model(**kwargs)
+                if with_deltas:
+                    premiums[i] = contract.price()
+                    deltas[i] = contract.calc_hedge_ratios(1)[0][0]
+                else:
+                    premiums[i] = contract.price(premium_only=True)
+        else:
+            group = records[indices]
+            result = model(**kwargs).price_batch(group['strike'], group['is_put'], group['is_american'],
+                                                 with_deltas)
+            if with_deltas:
+                premiums[indices], deltas[indices] = result
+            else:
+                premiums[indices] = result
+    if with_deltas:
+        return premiums, deltas
+    return premiums
+
+
+def tree_keys(records):
+    """
+    Returns one hashable key per contract, equal for contracts that share a tree
+    """
+    return [key.tobytes() for key in repack_fields(records[TREE_FIELDS])]
+
+
+def _price_chunk(indices, records, with_deltas=False):
+    """
+    Worker entry point; returns the positions of the contracts in the portfolio with their premiums,
+    or with their premiums and deltas
+    """
+    return indices, price_records(records, with_deltas)
+
+
+class PortfolioPricer(object):
+    """
+    Prices portfolios of independent contracts in a pool of processes.
+    Contracts are split in chunks by underlying, and each chunk is sent
+    to the workers as a structured array.
+    """
+
+    def __init__(self, max_workers=None, chunks_per_worker=4):
+        """
+        :param max_workers: number of worker processes, defaults to the number of CPUs
+        :param chunks_per_worker: number of chunks per worker, for load balancing
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Shuts down the pool of processes
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def split(self, records):
+        """
+        Splits the contracts in chunks, keeping the contracts of each underlying together.
+        Underlyings are assigned, largest first, to the chunk with the fewest contracts.
+        :return: list of arrays with the positions of the contracts in each chunk
+        """
+        groups = {}
+        for i, (underlying, key) in enumerate(zip(records['underlying'], tree_keys(records))):
+            # Contracts without an underlying label are grouped by their tree
+            groups.setdefault(underlying if underlying >= 0 else key, []).append(i)
+
+        n_chunks = min(len(groups), self.max_workers * self.chunks_per_worker)
+        chunks = [[] for _ in range(n_chunks)]
+        for indices in sorted(groups.values(), key=len, reverse=True):
+            min(chunks, key=len).extend(indices)
+        return [np.array(chunk) for chunk in chunks]
+
+    def price(self, specs, with_deltas=False):
+        """
+        Prices a portfolio of contracts
+        :param specs: sequence of contract specifications (see pack_specs) or a packed structured array
+        :param with_deltas: if True, the deltas of the contracts are also returned
+        :return: array of premiums in the order of the specifications, and the array of deltas
+                 if with_deltas is True
+        """
+        records = specs if isinstance(specs, np.ndarray) else pack_specs(specs)
+        premiums = np.empty(len(records))
+        deltas = np.empty(len(records))
+        if len(records) == 0:
+            pass
+        elif self.max_workers == 1:
+            result = price_records(records, with_deltas)
+            if with_deltas:
+                premiums[:], deltas[:] = result
+            else:
+                premiums[:] = result
+        else:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            futures = [self._executor.submit(_price_chunk, chunk, records[chunk], with_deltas)
+                       for chunk in self.split(records)]
+            for future in futures:
+                indices, result = future.result()
+                if with_deltas:
+                    premiums[indices], deltas[indices] = result
+                else:
+                    premiums[indices] = result
+
+        if with_deltas:
+            return premiums, deltas
+        return premiums
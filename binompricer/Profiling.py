@@ -0,0 +1,129 @@
+"""
+Opt-in instrumentation of the phases of the pricing: the construction of the price tree,
+the interest factors, the risk-neutral probabilities and the backward induction.
+While a PhaseProfiler is active, every phase is timed and, optionally, its memory is traced.
+When no profiler is active, a phase costs one extra function call.
+Only one profiler can be active at a time. It is process-wide, so phases run in other threads
+while it is active are recorded as well, although the memory of concurrent phases is traced together.
+"""
+import threading
+import time
+import tracemalloc
+
+_profiler = None
+# Guards the activation of the profilers and the update of their measurements
+_lock = threading.Lock()
+
+
+def active_profiler():
+    """
+    Returns the active profiler, or None
+    """
+    return _profiler
+
+
+def run_phase(phase, func, *args):
+    """
+    Calls func with args, recording it as a phase of the pricing if a profiler is active
+    :param phase: name of the phase
+    """
+    # The active profiler is read once, as another thread can exit it meanwhile
+    profiler = _profiler
+    if profiler is None:
+        return func(*args)
+    return profiler.record(phase, func, *args)
+
+
+class PhaseProfiler(object):
+    """
+    Records the wall time and memory of the phases of the pricing, while used as a context manager.
+    The measurements of every phase are aggregated, and can be passed to a callback as they happen.
+    Only one profiler can be active at a time.
+    """
+
+    def __init__(self, callback=None, trace_memory=True):
+        """
+        :param callback: function called with the name of a phase and a dictionary with its measurements
+        :param trace_memory: if True, the memory of every phase is traced with tracemalloc,
+                             which slows the pricing down
+
+        :attr stats: dictionary with the aggregate measurements of every phase:
+                     'calls', 'wall_time' and, if the memory is traced,
+                     'allocations': number of memory blocks allocated in the phase and still in use at its end,
+                     'bytes': memory allocated in the phase and still in use at its end,
+                     'peak_bytes': largest memory allocated during a call above the memory at its start
+        """
+        self.callback = callback
+        self.trace_memory = trace_memory
+        self.stats = {}
+        self._started_tracing = False
+
+    def __enter__(self):
+        global _profiler
+        with _lock:
+            if _profiler is not None:
+                raise ValueError("Another profiler is already active.")
+            _profiler = self
+            if self.trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _profiler
+        with _lock:
+            _profiler = None
+            if self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+    def __repr__(self):
+        return f"PhaseProfiler(phases={list(self.stats)})"
+
+    def record(self, phase, func, *args):
+        """
+        Calls func with args and records the measurements of the phase
+        :param phase: name of the phase
+        :return: result of the call
+        """
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            blocks = len(tracemalloc.take_snapshot().traces)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = func(*args)
+        measurements = {'wall_time': time.perf_counter() - start}
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            measurements.update(allocations=len(tracemalloc.take_snapshot().traces) - blocks,
+                                bytes=current - memory, peak_bytes=peak - memory)
+
+        with _lock:
+            stats = self.stats.setdefault(phase, {'calls': 0})
+            stats['calls'] += 1
+            for name, value in measurements.items():
+                if name == 'peak_bytes':
+                    stats[name] = max(stats.get(name, 0), value)
+                else:
+                    stats[name] = stats.get(name, 0) + value
+        if self.callback is not None:
+            self.callback(phase, measurements)
+        return result
+
+    def counters(self, prefix='binompricer'):
+        """
+        Returns the aggregate measurements as a flat dictionary, for export to a metrics system
+        :param prefix: prefix of the names of the counters
+        :return: dictionary with keys '<prefix>.<phase>.<measurement>'
+        """
+        with _lock:
+            return {f"{prefix}.{phase}.{name}": value
+                    for phase, stats in self.stats.items() for name, value in stats.items()}
+
+    def reset(self):
+        """
+        Clears the aggregate measurements
+        """
+        with _lock:
+            self.stats = {}
@@ -0,0 +1,49 @@
+import numpy as np
+
+from .BinomTreeOption import BinomialTreeOption
+from .Batch import price_trees
+
+
+def price_scenarios(option, spot_shifts=(0,), vol_shifts=(0,), rate_shifts=(0,), relative_spot=True):
+    """
+    Reprices an option over a grid of spot, volatility and interest rate shocks.
+    The trees of all the scenarios are rolled back in one vectorized backward induction.
+    The price changes and the risk-neutral probabilities of the trees are calculated once per
+    volatility and rate shock and broadcast across the spot shocks, unless they depend on the
+    initial price, as for Leisen - Reimer trees. A spot shock then only rescales the prices at maturity.
+    :param option: binomial option on a 'multiply' tree with a constant interest rate
+    :param spot_shifts: vector of shocks of the initial price
+    :param vol_shifts: vector of shifts of the volatility
+    :param rate_shifts: vector of shifts of the interest rate
+    :param relative_spot: if True, the initial prices are initial_price * (1 + spot_shifts),
+                          otherwise initial_price + spot_shifts
+    :return: array of premiums with shape (len(spot_shifts), len(vol_shifts), len(rate_shifts))
+    """
+    if not isinstance(option, BinomialTreeOption) or not option.has_constant_params:
+        raise ValueError("Scenarios need a binomial option on a 'multiply' tree with a constant 'int_rate'.")
+    spot_shifts, vol_shifts, rate_shifts = [np.atleast_1d(np.asarray(shifts, dtype=float))
+                                            for shifts in (spot_shifts, vol_shifts, rate_shifts)]
+    if spot_shifts.ndim > 1 or vol_shifts.ndim > 1 or rate_shifts.ndim > 1:
+        raise ValueError("The shocks have to be given as vectors.")
+
+    # One axis per kind of shock, so that every parameter broadcasts to the scenario cube
+    initial_price = (option.initial_price * (1 + spot_shifts) if relative_spot
+                     else option.initial_price + spot_shifts)[:, None, None]
+    volatility = (option.volatility + vol_shifts)[None, :, None]
+    int_rate = (option.int_rate + rate_shifts)[None, None, :]
+    if (initial_price <= 0).any():
+        raise ValueError("The shocked initial prices have to be positive.")
+    depends_on_volatility = (type(option).calc_price_changes is not BinomialTreeOption.calc_price_changes
+                             or option.smoothing is not None)
+    if depends_on_volatility and (volatility <= 0).any():
+        raise ValueError("The shocked volatilities have to be positive.")
+
+    u, d = option.calc_price_changes(volatility=volatility, int_rate=int_rate, initial_price=initial_price)
+    escrow = None
+    if option.divident_schedule:
+        escrow = option.escrowed_dividends(np.arange(option.steps + 1), int_rate)
+        if (initial_price <= escrow[0]).any():
+            raise ValueError("The escrowed dividends have to be smaller than the shocked initial prices.")
+    return price_trees(initial_price, u, d, int_rate, option.dividents, option.dt, option.strike, option.steps,
+                       not option.is_call, not option.is_european, volatility, option.smoothing, escrow,
+                       option.dtype)
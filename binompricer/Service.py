@@ -0,0 +1,214 @@
+"""
+Asyncio front-end of the pricers, for event loops that cannot block on a backward induction.
+Requests are priced in an executor. Concurrent requests for the same contract share one pricing,
+and the requests that arrive within a short window are priced together, with the options on the
+same tree priced in one vectorized call.
+
+    async with AsyncPricer(batch_window=0.002) as pricer:
+        premiums = await asyncio.gather(*(pricer.price(option) for option in options))
+        print(pricer.latency_percentiles())
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import numpy as np
+
+from .BinomTreeOption import BinomialTreeOption
+from .Cache import PricingCache
+from .StockOption import StockOption
+
+
+def batch_key(contract, keys):
+    """
+    Returns a key that is equal for the options that can be priced with one price_batch call,
+    or None for contracts that are priced on their own
+    :param keys: PricingCache whose keys are used
+    """
+    if not isinstance(contract, BinomialTreeOption) or not contract.has_constant_params:
+        return None
+    return (type(contract), keys.lattice_key(contract), contract.smoothing, keys.round(contract.volatility))
+
+
+def price_contracts(contracts, precision=10):
+    """
+    Prices a batch of contracts. Options that share a tree are priced with one price_batch call,
+    and the other contracts one by one, keeping only the premium.
+    A contract that cannot be priced does not fail the others.
+    :param contracts: sequence of BinomialTreeOption, TrinomialTreeOption or BinomialTreeFutures
+    :param precision: number of decimals the float parameters are rounded to, to group the options by tree
+    :return: list with the premium of every contract, or the exception raised when pricing it
+    """
+    keys = PricingCache(precision=precision)
+    groups = {}
+    for i, contract in enumerate(contracts):
+        key = batch_key(contract, keys)
+        groups.setdefault(i if key is None else key, []).append(i)
+
+    results = [None] * len(contracts)
+    for indices in groups.values():
+        group = [contracts[i] for i in indices]
+        if len(group) > 1:
+            try:
+                premiums = group[0].price_batch([option.strike for option in group],
+                                                [not option.is_call for option in group],
+                                                [not option.is_european for option in group])
+            except Exception:
+                # The options are priced one by one, to find the ones that fail
+                pass
+            else:
+                for i, premium in zip(indices, premiums):
+                    results[i] = float(premium)
+                continue
+        for i, contract in zip(indices, group):
+            try:
+                premium = contract.price(premium_only=True) if isinstance(contract, StockOption) else contract.price()
+                results[i] = float(premium)
+            except Exception as error:
+                results[i] = error
+    return results
+
+
+class AsyncPricer(object):
+    """
+    Asyncio facade of the pricers. Calls to price() are awaited while the contracts are priced in an
+    executor, so the event loop is not blocked. Requests for a contract that is already being priced,
+    with the same parameters up to precision decimals, wait for the same result. The requests that
+    arrive within batch_window seconds are priced together by price_contracts, in one executor call.
+    The latencies of the last requests, from the call to the result, are kept for their percentiles.
+    """
+
+    def __init__(self, executor=None, batch_window=0.001, max_batch_size=1024, precision=10, history=10000):
+        """
+        :param executor: concurrent.futures executor in which the contracts are priced. Defaults to a
+                         thread, which the pricer shuts down on close(). A ProcessPoolExecutor prices
+                         batches in parallel, but copies the contracts to its processes.
+        :param batch_window: seconds that a batch waits for more requests after the first one
+        :param max_batch_size: number of contracts that are priced at once, without waiting for the window
+        :param precision: number of decimals the float parameters are rounded to, to match requests
+        :param history: number of the last latencies that are kept
+
+        :attr requests: number of requests
+        :attr coalesced: number of requests that waited for the result of an identical request
+        :attr batches: number of batches sent to the executor
+        """
+        if batch_window < 0:
+            raise ValueError("The batch window cannot be negative.")
+        if max_batch_size < 1 or history < 1:
+            raise ValueError("The batch size and the history have to be at least one.")
+        self._owns_executor = executor is None
+        self.executor = ThreadPoolExecutor(max_workers=1) if executor is None else executor
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.precision = precision
+        self.latencies = deque(maxlen=history)
+        self.requests, self.coalesced, self.batches = 0, 0, 0
+        self._keys = PricingCache(precision=precision)
+        self._in_flight = {}
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+
+    def __repr__(self):
+        return (f"AsyncPricer(requests={self.requests}, coalesced={self.coalesced}, batches={self.batches}, "
+                f"in_flight={len(self._in_flight)})")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def request_key(self, contract):
+        """
+        Returns the key that identifies the requests for the same premium.
+        Trees that are given directly or have an interest rates tree are only matched
+        with the requests for the same object.
+        """
+        lattice_key = self._keys.lattice_key(contract)
+        if lattice_key is None:
+            return id(contract)
+        return self._keys.premium_key(contract, lattice_key)
+
+    async def price(self, contract):
+        """
+        Prices an option or futures contract. The contract should not be modified until the result.
+        :param contract: BinomialTreeOption, TrinomialTreeOption or BinomialTreeFutures
+        :return: premium of the contract
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        key = self.request_key(contract)
+        future = self._in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._in_flight[key] = loop.create_future()
+            self._pending.append((key, contract))
+            if len(self._pending) >= self.max_batch_size:
+                self.flush()
+            elif self._flush_handle is None:
+                self._flush_handle = loop.call_later(self.batch_window, self.flush)
+        else:
+            self.coalesced += 1
+        try:
+            # A cancelled request does not cancel the identical requests that wait for the same result
+            return await asyncio.shield(future)
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+
+    def flush(self):
+        """
+        Sends the pending requests to the executor without waiting for the end of the batch window
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self.batches += 1
+        task = asyncio.get_running_loop().create_task(self._price_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _price_batch(self, batch):
+        """
+        Prices a batch in the executor and sets the results of its requests
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, price_contracts,
+                                                 [contract for _, contract in batch], self.precision)
+        except Exception as error:
+            results = [error] * len(batch)
+        for (key, _), result in zip(batch, results):
+            future = self._in_flight.pop(key)
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def latency_percentiles(self, percentiles=(50, 90, 99)):
+        """
+        Returns the percentiles of the latencies of the last requests, in seconds
+        :param percentiles: percentiles between 0 and 100
+        :return: dictionary from the percentiles to the latencies, which are NaN before the first request
+        """
+        if not self.latencies:
+            return {percentile: float('nan') for percentile in percentiles}
+        values = np.percentile(np.fromiter(self.latencies, dtype=float), percentiles)
+        return dict(zip(percentiles, values.tolist()))
+
+    async def close(self):
+        """
+        Prices the pending requests, waits for the batches in the executor,
+        and shuts down the executor if it was created by the pricer
+        """
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks)
+        if self._owns_executor:
+            self.executor.shutdown()
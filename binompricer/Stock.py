@@ -1,15 +1,21 @@
 import numpy as np
 import math
 
+from .Lattice import TriangularLattice, ConstantLattice, level_factors
+from . import Profiling
+
 
 class Stock(object):
     """
     Stores commont attributtes of stocks and interest rates
     """
+    # Whether the discounts of a tree with an interest rates tree are folded into the risk-neutral probabilities
+    fold_discounts = False
 
     def __init__(self, initial_price=None, price_tree=None, maturity=1, steps=2,
                  probs=(None, None), price_changes=(None, None), tree_method='multiply',
-                 int_rate=0.05, int_rates_tree=None, volatility=0, dividents=0):
+                 int_rate=0.05, int_rates_tree=None, volatility=0, dividents=0, divident_schedule=None,
+                 dtype=float):
         """
         Stores common attributes for a stock futures contract
         :param initial_price: value of the stock at time t=0
@@ -25,7 +31,12 @@ class Stock(object):
         :param int_rates_tree: interest rates tree
         :param volatility: volatility
         :param dividents: divident yield
+        :param divident_schedule: sequence of (time, amount) pairs of discrete cash dividends
+        :param dtype: floating point type of the lattices, e.g. np.float32 to halve their memory
         """
+        self.dtype = np.dtype(dtype)
+        if self.dtype.kind != 'f':
+            raise ValueError("The 'dtype' of the lattices has to be a floating point type.")
 
         self.maturity = maturity
         self.pu, self.pd = probs[0], probs[1]
@@ -69,6 +80,8 @@ class Stock(object):
         self.discounts = []
         self.risk_free_probs_up = []
         self.risk_free_probs_down = []
+        self.qu, self.qd = None, None
+        self.divident_schedule = divident_schedule
 
     @property
     def maturity(self):
@@ -146,16 +159,55 @@ class Stock(object):
             if not price_tree:
                 raise ValueError("The price tree cannot be of zero length.")
             else:
-                for i, array in enumerate(price_tree):
-                    if len(array) != i + 1:
-                        raise ValueError("Assuming the tree is recombining, the number of nodes should start from one"
-                                         " and increase by one.")
-                self.steps = len(price_tree) - 1
-                self.initial_price = price_tree[0][0]
-                self._price_tree = [np.array(lst) for lst in price_tree]
+                self._price_tree = TriangularLattice.from_levels(price_tree, self.dtype)
+                self.steps = self._price_tree.steps
+                self.initial_price = self._price_tree[0][0]
         else:
             self._price_tree = None
 
+    @property
+    def divident_schedule(self):
+        """ Getter of the divident schedule """
+        return self._divident_schedule
+
+    @divident_schedule.setter
+    def divident_schedule(self, divident_schedule):
+        """
+        Setter of the divident schedule
+        The dividends are stored as (time, amount) pairs sorted by time
+        """
+        if not divident_schedule:
+            self._divident_schedule = ()
+            return
+        if self.tree_method == 'direct' or self.int_rates_tree is not None:
+            raise ValueError("A 'divident_schedule' needs a 'multiply' or 'add' tree with a constant 'int_rate'.")
+        schedule = tuple(sorted((float(time), float(amount)) for time, amount in divident_schedule))
+        if any(time <= 0 or amount < 0 for time, amount in schedule):
+            raise ValueError("The dividends of the schedule have to be paid after t=0 and be non-negative.")
+        self._divident_schedule = schedule
+        if self.tree_method == 'multiply' and self.initial_price <= self.escrowed_dividends(0):
+            raise ValueError("The escrowed dividends have to be smaller than the initial price.")
+
+    def escrowed_dividends(self, levels, int_rate=None):
+        """
+        Returns the present value at time steps of the dividends of the schedule paid after them, up to maturity.
+        The price of the stock is the price of a recombining tree started from the initial price net of
+        the escrowed dividends, plus the dividends still in escrow, so the tree stays recombining.
+        Nodes at the time of a dividend are ex-dividend.
+        :param levels: time step, or array of time steps
+        :param int_rate: interest rate of the present values, defaults to that of the stock;
+                         an array of rates adds a last axis
+        """
+        int_rate = self.int_rate if int_rate is None else np.asarray(int_rate)
+        times = np.multiply.outer(np.asarray(levels) * self.dt, np.ones(np.shape(int_rate)))
+        escrow = np.zeros(times.shape)
+        # Tolerance on the time of a dividend for the rounding of the time steps
+        tol = 1e-9 * self.maturity
+        for time, amount in self.divident_schedule:
+            if time <= self.maturity + tol:
+                escrow += np.where(times < time - tol, amount * np.exp(-int_rate * (time - times)), 0)
+        return escrow
+
     @property
     def tree_method(self):
         """ Tree method getter """
@@ -174,26 +226,152 @@ class Stock(object):
     def calc_price_tree(self):
         """
         Calculates the stock price tree using the factors or summands u and d.
+        The nodes are calculated in closed form and written level by level
+        into a single contiguous array, whose levels are exposed as views.
+        """
+        if self.price_tree is None:
+            # The nodes are calculated in double precision and stored in the type of the lattices
+            price_tree = TriangularLattice(self.steps, dtype=self.dtype)
+            levels = np.arange(self.steps + 1)
+            # With a divident schedule, the tree starts from the initial price net of the escrowed
+            # dividends, and the dividends in escrow at every step are added to its levels
+            escrow = self.escrowed_dividends(levels) if self.divident_schedule else None
+            initial_price = self.initial_price if escrow is None else self.initial_price - escrow[0]
+
+            if self.tree_method == 'multiply':
+                # Node j at step n is S0 * u^(n-j) * d^j
+                ups = initial_price * np.power(float(self.u), levels)
+                downs = np.power(float(self.d), levels)
+                for n in levels:
+                    level = np.multiply(ups[n::-1], downs[:n + 1], out=price_tree[n])
+                    if escrow is not None:
+                        level += escrow[n]
+            elif self.tree_method == 'add':
+                # Node j at step n is S0 + (n-j) * u - j * d
+                ups = initial_price + levels * float(self.u)
+                if escrow is not None:
+                    ups += escrow
+                downs = levels * float(self.u + self.d)
+                for n in levels:
+                    np.subtract(ups[n], downs[:n + 1], out=price_tree[n])
+
+            self._price_tree = price_tree
+
+    def escrow_tree(self):
+        """
+        Returns the escrowed dividends at every node of the price tree, as a packed array
+        """
+        levels = np.arange(self.steps + 1)
+        return np.repeat(self.escrowed_dividends(levels), levels + 1).astype(self.dtype)
+
+    def update_price_tree(self, initial_price):
         """
+        Moves the price tree to a new initial price. The nodes of a 'multiply' tree scale
+        with the initial price and those of an 'add' tree shift with it, so a stored tree is
+        updated in place; a tree shared with a PricingCache is copied first. The risk-neutral
+        probabilities of a 'multiply' tree do not depend on the initial price, while those
+        of an 'add' tree are recalculated.
+        :param initial_price: new value of the stock at time t=0
+        """
+        if self.tree_method == 'direct':
+            raise ValueError("The initial price of a price tree that is given directly cannot be updated.")
+        previous_price, self.initial_price = self.initial_price, initial_price
         if self.price_tree is None:
-            # Initialize a 2D tree at t=0
-            price_tree = [np.array([self.initial_price])]
-            # Simulate all possible stock prices path
-            for i in range(self.steps):
-                prev_branches = price_tree[-1]
-
-                if self.tree_method == 'multiply':
-                    st = np.concatenate(
-                        (prev_branches * self.u,
-                         [prev_branches[-1] * self.d]))
-                elif self.tree_method == 'add':
-                    st = np.concatenate(
-                        (prev_branches + self.u,
-                         [prev_branches[-1] - self.d]))
-
-                # Add nodes at each time step
-                price_tree.append(st)
-            self.price_tree = price_tree
+            return
+
+        price_tree = self.price_tree
+        if not price_tree.data.flags.writeable:
+            price_tree = TriangularLattice(price_tree.steps, price_tree.data.copy())
+        if self.tree_method == 'multiply' and self.divident_schedule:
+            # Only the price net of the escrowed dividends scales
+            self._price_tree = None
+            self.calc_price_tree()
+        elif self.tree_method == 'multiply' and previous_price != 0:
+            price_tree.data *= initial_price / previous_price
+            self._price_tree = price_tree
+        elif self.tree_method == 'multiply':
+            self._price_tree = None
+            self.calc_price_tree()
+        else:
+            price_tree.data += initial_price - previous_price
+            self._price_tree = price_tree
+            self.calc_risk_neutral_probs()
+
+    def roll_anchor(self, maturity, tol):
+        """
+        Finds where the stored tree can be re-anchored for a shorter maturity, keeping the time step.
+        Dropping k levels leaves a tree of steps - k steps, whose time step drifts from dt by
+        maturity / (steps - k) - dt. Among the levels with a relative drift within tol, the closest
+        one with a node at the initial price is preferred, as the payoffs from that node on are
+        already known.
+        :param maturity: new time to maturity
+        :param tol: tolerance on the relative drift of the time step
+        :return: level and node of the new root and whether its price is the initial price,
+                 or None if no level is within the tolerance
+        """
+        lowest = max(1, math.ceil(maturity / (self.dt * (1 + tol))))
+        highest = min(self.steps, math.floor(maturity / (self.dt * (1 - tol)))) if tol < 1 else self.steps
+        remaining = sorted(range(lowest, highest + 1), key=lambda n: abs(maturity / n - self.dt))
+        anchor = None
+        for n in remaining:
+            level = self.steps - n
+            prices = self.price_tree[level]
+            node = int(np.argmin(np.abs(prices - self.initial_price)))
+            if np.isclose(prices[node], self.initial_price, rtol=1e-12, atol=0):
+                return level, node, True
+            if anchor is None:
+                anchor = level, node, False
+        return anchor
+
+    def roll_lattices(self, level, node):
+        """
+        Re-anchors the stored trees at a node, dropping the levels before it.
+        The nodes are moved within the arrays of the trees, unless they are read-only.
+        The initial price becomes the price at that node.
+        :param level: level of the new root
+        :param node: position of the new root in its level
+        """
+        if self.int_rates_tree is not None:
+            self._int_rates_tree = self.int_rates_tree.subtree(level, node, in_place=True)
+        self.interest_factors = self.interest_factors.subtree(level, node, in_place=True)
+        self.discounts = self.discounts.subtree(level, node, in_place=True)
+        self.risk_free_probs_up = self.risk_free_probs_up.subtree(level, node, in_place=True)
+        self.risk_free_probs_down = self.risk_free_probs_down.subtree(level, node, in_place=True)
+        self._price_tree = self.price_tree.subtree(level, node, in_place=True)
+        self.steps = self.price_tree.steps
+        self.initial_price = self.price_tree[0][0].item()
+
+    def price_level(self, n, escrow=None):
+        """
+        Returns the stock prices at time step n.
+        If the price tree is not stored, the prices are calculated in closed form
+        :param n: time step
+        :param escrow: escrowed dividends at every time step, calculated if not given
+        """
+        if self.price_tree is not None:
+            return self.price_tree[n]
+
+        downs = np.arange(n + 1)
+        initial_price = self.initial_price
+        if self.divident_schedule:
+            escrow = self.escrowed_dividends(np.arange(self.steps + 1)) if escrow is None else escrow
+            initial_price, escrow = initial_price - escrow[0], escrow[n]
+        else:
+            escrow = 0
+        if self.tree_method == 'multiply':
+            prices = initial_price * np.power(float(self.u), n - downs) * np.power(float(self.d), downs) + escrow
+        else:
+            prices = initial_price + (n - downs) * self.u - downs * self.d + escrow
+        return prices.astype(self.dtype, copy=False)
+
+    def interest_factor_level(self, n):
+        """
+        Returns the interest factors at time step n, without storing the discounting tree
+        :param n: time step
+        """
+        if self.int_rates_tree is None:
+            return math.exp((self.int_rate - self.dividents) * self.dt)
+        return np.exp((self.int_rates_tree[n] - self.dividents) * self.dt)
 
     @property
     def int_rates_tree(self):
@@ -204,46 +382,111 @@ class Stock(object):
     def int_rates_tree(self, int_rates_tree):
         """
         Setter of interest rates tree
-        Every time the interes rates tree is set,
-        the discounting tree is also calculated
+        The rates are stored as a packed lattice
          """
         if int_rates_tree is None:
             if self.int_rate is None:
                 raise ValueError("If no 'int_rates_tree' is provided, 'int_rate' has to be specified.")
             self._int_rates_tree = int_rates_tree
         else:
-            for i, array in enumerate(int_rates_tree):
-                if len(array) != i + 1:
-                    raise ValueError("Assuming the tree is recombining, the number of nodes should start from one"
-                                     " and increase by one.")
+            int_rates_tree = TriangularLattice.from_levels(int_rates_tree, self.dtype)
             if len(int_rates_tree) < self.steps:
                 raise ValueError("The 'int_rates_tree' must have length at least equal to 'steps' - 1.")
 
-            self._int_rates_tree = [np.array(lst) for lst in int_rates_tree]
+            self._int_rates_tree = int_rates_tree
 
     def calc_interest_factors(self):
-        """ Calculates discounting tree """
+        """
+        Calculates discounting tree.
+        The factors of an interest rates tree are calculated with one exponential over its packed
+        nodes. If the discounts are folded into the risk-neutral probabilities, they are all one.
+        Constant factors are kept as Python floats, which take the type of the lattices they multiply.
+        """
         if self.int_rates_tree is None:
             dr = math.exp((self.int_rate - self.dividents) * self.dt)  # Interest factor for each step
-            self.interest_factors = []
-            self.discounts = []
-            for i in range(1, self.steps + 1):
-                self.interest_factors.append(np.full(i, dr))
-                self.discounts.append(np.full(i, 1 / dr))
+            self.interest_factors = ConstantLattice(self.steps - 1, dr)
+            self.discounts = ConstantLattice(self.steps - 1, 1 / dr)
+            return
+
+        nodes = self.steps * (self.steps + 1) // 2
+        rates = self.int_rates_tree.data[:nodes]
+        self.interest_factors = TriangularLattice(self.steps - 1, np.exp((rates - self.dividents) * self.dt))
+        if self.fold_discounts:
+            self.discounts = ConstantLattice(self.steps - 1, 1.)
         else:
-            self.interest_factors = [np.array([math.exp((rtj - self.dividents) * self.dt) for rtj in rt])
-                                     for rt in self.int_rates_tree]
-            self.discounts = [np.array([1 / dr_nj for dr_nj in dr_n])
-                              for dr_n in self.interest_factors]
+            self.discounts = TriangularLattice(self.steps - 1, np.exp(-(rates - self.dividents) * self.dt))
+
+    @property
+    def has_constant_params(self):
+        """
+        True if the price changes and interest factors are the same at every node
+        """
+        return self.tree_method == 'multiply' and self.int_rates_tree is None
+
+    def step_factors(self, levels, discounted=True):
+        """
+        Returns the risk-neutral probabilities (qu, qd) of a tree with constant parameters, discounted
+        over a step if discounted is True, with one row per level in the type of the lattices
+        :param levels: number of levels of the backward induction
+        """
+        return level_factors((self.qu, self.qd), self.discounts[0] if discounted else 1., levels, self.dtype)
+
+    def calc_lattices(self):
+        """
+        Calculates the price tree, the interest factors and the risk-neutral probabilities
+        """
+        Profiling.run_phase('calc_price_tree', self.calc_price_tree)
+        Profiling.run_phase('calc_interest_factors', self.calc_interest_factors)
+        Profiling.run_phase('calc_risk_neutral_probs', self.calc_risk_neutral_probs)
+
+    @property
+    def lattices(self):
+        """
+        Getter of the price tree, interest factors, discounts and risk-neutral probabilities,
+        which depend only on the underlying and the shape of the tree
+        """
+        return (self.price_tree, self.interest_factors, self.discounts,
+                self.risk_free_probs_up, self.risk_free_probs_down, self.qu, self.qd)
+
+    @lattices.setter
+    def lattices(self, lattices):
+        """ Setter of lattices calculated for a tree with the same parameters """
+        (self._price_tree, self.interest_factors, self.discounts,
+         self.risk_free_probs_up, self.risk_free_probs_down, self.qu, self.qd) = lattices
 
     def calc_risk_neutral_probs(self):
         """
-        Calculates the risk-neutral probabilities tree
+        Calculates the risk-neutral probabilities tree.
+        For trees with constant parameters, the probabilities are the scalars qu and qd.
+        If the discounts are folded, the probabilities of a tree with an interest rates tree
+        are discounted, so the backward induction needs no discount lattice.
         """
-        rf_probs_up = []
-        for n in range(self.steps):
-            numerator = self.price_tree[n][:] * self.interest_factors[n][:] - self.price_tree[n+1][1:]
-            denominator = self.price_tree[n+1][:-1] - self.price_tree[n+1][1:]
-            rf_probs_up.append(np.array(numerator / denominator))
-        self.risk_free_probs_up = np.array(rf_probs_up, dtype=object)
-        self.risk_free_probs_down = 1 - self.risk_free_probs_up
+        if self.has_constant_params:
+            dr = self.interest_factors[0]
+            self.qu = float((dr - self.d) / (self.u - self.d))
+            self.qd = 1 - self.qu
+            self.risk_free_probs_up = ConstantLattice(self.steps - 1, self.qu)
+            self.risk_free_probs_down = ConstantLattice(self.steps - 1, self.qd)
+            return
+
+        self.qu, self.qd = None, None
+        nodes = self.steps * (self.steps + 1) // 2
+        price_tree = self.price_tree
+        if self.divident_schedule:
+            # The probabilities are those of the tree net of the escrowed dividends
+            price_tree = TriangularLattice(self.steps, price_tree.data - self.escrow_tree())
+        prices = price_tree.data[:nodes]
+        if isinstance(self.interest_factors, ConstantLattice):
+            factors = self.interest_factors.value
+        else:
+            factors = self.interest_factors.data[:nodes]
+        prices_up = price_tree.upper_nodes()
+        prices_down = price_tree.lower_nodes()
+        probs_up = (prices * factors - prices_down) / (prices_up - prices_down)
+        if self.fold_discounts and self.int_rates_tree is not None:
+            probs_down = (1 - probs_up) / factors
+            probs_up /= factors
+        else:
+            probs_down = 1 - probs_up
+        self.risk_free_probs_up = TriangularLattice(self.steps - 1, probs_up)
+        self.risk_free_probs_down = TriangularLattice(self.steps - 1, probs_down)
@@ -10,9 +10,9 @@ class StockOption(Stock):
                  initial_price=None, price_tree=None, steps=2,
                  probs=(None, None), price_changes=(None, None), tree_method='multiply',
                  int_rate=0.05, int_rates_tree=None, volatility=0, dividents=0,
-                 is_put=False, is_american=False):
+                 is_put=False, is_american=False, divident_schedule=None, dtype=float):
         super().__init__(initial_price, price_tree, maturity, steps, probs, price_changes, tree_method,
-                         int_rate, int_rates_tree, volatility, dividents)
+                         int_rate, int_rates_tree, volatility, dividents, divident_schedule, dtype)
         """
         Initialize the stock option class
         Defaults to European call unless specified
@@ -22,6 +22,8 @@ class StockOption(Stock):
                        False for a call option
         :param is_american: True for an American option,
                             False for a European option
+        :param divident_schedule: sequence of (time, amount) pairs of discrete cash dividends
+        :param dtype: floating point type of the lattices
                             
         :attr hedge_ratios: hedge ratios at every step
         """
@@ -0,0 +1,226 @@
+import math
+
+import numpy as np
+
+from .StockOption import StockOption
+from .Lattice import TrinomialLattice, level_factors
+from . import Profiling
+
+
+class TrinomialTreeOption(StockOption):
+    """
+    Price a European or American option by the Kamrad - Ritchken trinomial tree.
+    From every node the price moves up by u = exp(stretch * volatility * sqrt(dt)), stays, or moves
+    down by d = 1 / u. The stretch 1 gives the CRR tree, sqrt(2) the spacing of the Boyle tree,
+    and the default sqrt(3 / 2) equal probabilities for a zero drift.
+    As in the binomial trees, the payoffs are discounted with the interest factor net of the divident yield.
+    """
+    convergence_order = 1
+    odd_steps = False
+    odd_even_oscillation = False
+
+    def __init__(self, strike, maturity, initial_price, steps=2, int_rate=0.05, volatility=0.3, dividents=0,
+                 is_put=False, is_american=False, stretch=math.sqrt(1.5), dtype=float):
+        """
+        :param strike: strike price
+        :param maturity: time to maturity
+        :param initial_price: value of the stock at time t=0
+        :param steps: steps of the tree
+        :param int_rate: risk-free interest rate
+        :param volatility: volatility
+        :param dividents: divident yield
+        :param is_put: True for a put option, False for a call option
+        :param is_american: True for an American option, False for a European option
+        :param stretch: spacing of the price levels in standard deviations of a step, at least 1
+        :param dtype: floating point type of the lattices
+
+        :attr qu, qm, qd: risk-neutral probabilities to the up, middle and down state
+        """
+        if not volatility > 0:
+            raise ValueError("The trinomial tree needs a positive 'volatility'.")
+        if stretch < 1:
+            raise ValueError("The stretch of the trinomial tree has to be at least 1.")
+        dt = maturity / float(steps)
+        u = math.exp(stretch * volatility * math.sqrt(dt))
+        super().__init__(strike, maturity, initial_price, None, steps, (None, None), (u, 1 / u), 'multiply',
+                         int_rate, None, volatility, dividents, is_put, is_american, dtype=dtype)
+        self.stretch = stretch
+        self.qu, self.qm, self.qd = self.calc_probs(volatility, int_rate)
+        if min(self.qu, self.qd) < 0:
+            raise ValueError("The trinomial probabilities are negative; increase the number of steps.")
+        self.hedge_ratios = []
+        self.payoff_tree = []
+        self.premium = 0
+
+    def calc_probs(self, volatility, int_rate):
+        """
+        Returns the Kamrad - Ritchken probabilities (qu, qm, qd) for a volatility and an interest rate
+        """
+        drift = (int_rate - self.dividents - volatility ** 2 / 2) * math.sqrt(self.dt) / (self.stretch * volatility)
+        side = 1 / (2 * self.stretch ** 2)
+        return side + drift / 2, 1 - 2 * side, side - drift / 2
+
+    def price_powers(self):
+        """
+        Returns S0 * u^k for k = steps, steps - 1, ..., -steps.
+        Level n of the tree is the slice [steps - n, steps + n] of these prices.
+        """
+        powers = self.initial_price * np.power(float(self.u), np.arange(self.steps, -self.steps - 1, -1))
+        return powers.astype(self.dtype, copy=False)
+
+    def calc_price_tree(self):
+        """
+        Calculates the stock price tree, whose levels are slices of the same powers of u
+        """
+        if self.price_tree is None:
+            powers = self.price_powers()
+            price_tree = TrinomialLattice(self.steps, dtype=self.dtype)
+            for n in range(self.steps + 1):
+                price_tree[n] = powers[self.steps - n:self.steps + n + 1]
+            self._price_tree = price_tree
+
+    def price_level(self, n):
+        """
+        Returns the stock prices at time step n
+        :param n: time step
+        """
+        if self.price_tree is not None:
+            return self.price_tree[n]
+        prices = self.initial_price * np.power(float(self.u), np.arange(n, -n - 1, -1))
+        return prices.astype(self.dtype, copy=False)
+
+    def calc_risk_neutral_probs(self):
+        """
+        The risk-neutral probabilities are the same at every node and are calculated at initialisation
+        """
+
+    def exercise_values(self, prices):
+        """
+        Returns the payoffs from exercising the option at the given prices
+        """
+        return np.maximum(0, prices - self.strike) if self.is_call else np.maximum(0, self.strike - prices)
+
+    def traverse_tree(self):
+        """
+        Starting from the time of maturity, traverse backwards
+        and calculate discounted payoffs at each node
+        """
+        self.payoff_tree = TrinomialLattice(self.steps, dtype=self.dtype)
+        self.payoff_tree[self.steps] = self.exercise_values(self.price_tree[self.steps])
+        factors = level_factors((self.qu, self.qm, self.qd), self.discounts[0], self.steps, self.dtype)
+        payoffs = self.payoff_tree[self.steps]
+        for i in reversed(range(self.steps)):
+            next_payoffs, payoffs = payoffs, self.payoff_tree[i]
+            up, middle, down = factors[i]
+            np.multiply(next_payoffs[:-2], up, out=payoffs)
+            payoffs += next_payoffs[1:-1] * middle
+            payoffs += next_payoffs[2:] * down
+            if not self.is_european:
+                np.maximum(payoffs, self.exercise_values(self.price_tree[i]), out=payoffs)
+        return self.payoff_tree
+
+    def traverse_tree_lean(self):
+        """
+        Traverses the tree backwards keeping only the current level of payoffs
+        """
+        powers = self.price_powers()
+        discount = 1 / math.exp((self.int_rate - self.dividents) * self.dt)
+        factors = level_factors((self.qu, self.qm, self.qd), discount, self.steps, self.dtype)
+        payoffs = self.exercise_values(powers)
+        for i in reversed(range(self.steps)):
+            up, middle, down = factors[i]
+            payoffs = payoffs[:-2] * up + payoffs[1:-1] * middle + payoffs[2:] * down
+            if not self.is_european:
+                np.maximum(payoffs, self.exercise_values(powers[self.steps - i:self.steps + i + 1]), out=payoffs)
+        return payoffs
+
+    def price(self, premium_only=False):
+        """
+        Entry point of the pricing implementation
+        :param premium_only: if True, only the premium is calculated and the price and
+                             payoff trees are not stored. The trees are needed for the
+                             calculation of the hedge ratios and the greeks.
+        """
+        self.hedge_ratios = []
+        if premium_only:
+            self.payoff_tree = []
+            self.premium = Profiling.run_phase('traverse_tree_lean', self.traverse_tree_lean)[0].item()
+            return self.premium
+
+        self.calc_lattices()
+        return self.price_from_lattices()
+
+    def price_from_lattices(self):
+        """
+        Runs the backward induction over the price tree, which has to be calculated
+        """
+        self.hedge_ratios = []
+        payoffs = Profiling.run_phase('traverse_tree', self.traverse_tree)
+        self.premium = payoffs[0].item()
+        return self.premium
+
+    def bumped_premium(self, volatility=None, int_rate=None):
+        """
+        Returns the premium of the same option with a different volatility or interest rate
+        """
+        option = TrinomialTreeOption(self.strike, self.maturity, self.initial_price, self.steps,
+                                     self.int_rate if int_rate is None else int_rate,
+                                     self.volatility if volatility is None else volatility,
+                                     self.dividents, not self.is_call, not self.is_european, self.stretch,
+                                     self.dtype)
+        return option.price(premium_only=True)
+
+    def greeks(self, vol_bump=0.01, rate_bump=0.0001):
+        """
+        Calculates the sensitivities of the premium.
+        Delta, gamma and theta are read from the first two levels of the payoff and price trees,
+        where the middle node stays at the initial price. Vega and rho are central differences
+        of trees with bumped parameters.
+        :param vol_bump: bump of the volatility for vega
+        :param rate_bump: bump of the interest rate for rho
+        :return: dictionary with the delta, gamma, theta, vega and rho of the option
+        """
+        if not self.payoff_tree:
+            self.price()
+        values, prices = self.payoff_tree, self.price_tree
+
+        delta = (values[1][0] - values[1][2]) / (prices[1][0] - prices[1][2])
+        delta_up = (values[1][0] - values[1][1]) / (prices[1][0] - prices[1][1])
+        delta_down = (values[1][1] - values[1][2]) / (prices[1][1] - prices[1][2])
+        gamma = (delta_up - delta_down) / ((prices[1][0] - prices[1][2]) / 2)
+        theta = (values[1][1] - values[0][0]) / self.dt
+        vega = (self.bumped_premium(volatility=self.volatility + vol_bump)
+                - self.bumped_premium(volatility=self.volatility - vol_bump)) / (2 * vol_bump)
+        rho = (self.bumped_premium(int_rate=self.int_rate + rate_bump)
+               - self.bumped_premium(int_rate=self.int_rate - rate_bump)) / (2 * rate_bump)
+        return {'delta': delta.item(), 'gamma': gamma.item(), 'theta': theta.item(), 'vega': vega, 'rho': rho}
+
+    def calc_hedge_ratios(self, levels=None):
+        """
+        Calculates the hedge ratios at every node of the tree, from the up and down children
+        of every node, in one pass over the packed payoff and price trees.
+        The hedge ratios are cached until the option is priced again.
+        :param levels: number of time steps to calculate the hedge ratios for, defaults to all of them
+        """
+        if not self.payoff_tree:
+            raise ValueError("The hedge ratios need the payoff tree. Price the option with 'premium_only=False'.")
+        levels = self.steps if levels is None else levels
+        if not 1 <= levels <= self.steps:
+            raise ValueError("The levels of the hedge ratios have to be between 1 and 'steps'.")
+
+        offsets = self.payoff_tree.offsets
+        if len(self.hedge_ratios) < levels:
+            nodes = offsets[levels + 1]
+            values, prices = self.payoff_tree.data[1:nodes], self.price_tree.data[1:nodes]
+            dw = values[:-2] - values[2:]
+            ds = prices[:-2] - prices[2:]
+            # Drop the differences that reach into the next level, from the last two nodes of every level
+            within_level = np.ones(nodes - 3, dtype=bool)
+            next_levels = offsets[2:levels + 1] - 1
+            within_level[next_levels - 2] = False
+            within_level[next_levels - 1] = False
+            self.hedge_ratios = TrinomialLattice(levels - 1, dw[within_level] / ds[within_level])
+
+        if len(self.hedge_ratios) > levels:
+            return TrinomialLattice(levels - 1, self.hedge_ratios.data[:offsets[levels]])
+        return self.hedge_ratios
@@ -1,3 +1,5 @@
+from .Lattice import TriangularLattice, TrinomialLattice
+from . import Kernels
 from .Stock import Stock
 from .StockOption import StockOption
 from .StockFutures import StockFutures
@@ -7,3 +9,14 @@ from .BinomLROption import BinomialLROption
 from .BinomCRROption import BinomialCRROption
 
 from .BinomTreeFutures import BinomialTreeFutures
+
+from .TrinomTreeOption import TrinomialTreeOption
+
+from .Extrapolation import RichardsonOption
+from .Portfolio import PortfolioPricer
+from .ImpliedVolatility import implied_volatility
+from .Scenarios import price_scenarios
+from .Service import AsyncPricer
+from .Cache import PricingCache
+from .Profiling import PhaseProfiler
+from . import Profiling
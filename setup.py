@@ -15,6 +15,8 @@ setup(
     long_description=LONG_DESCRIPTION,
     packages=find_packages(),
     install_requires=['numpy'],
+    extras_require={'numba': ['numba'], 'parquet': ['pyarrow']},
+    entry_points={'console_scripts': ['binompricer=binompricer.CommandLine:main']},
     keywords=['python', 'options', 'futures', 'option pricing', 'futures pricing', 'pricing', 'binomial pricing'],
     classifiers=[
         "Development Status :: 1 - Planning",
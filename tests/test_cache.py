@@ -0,0 +1,87 @@
+import unittest
+import sys
+import os
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import BinomialTreeFutures
+from binompricer import PricingCache
+
+
+class PricingCacheTest(unittest.TestCase):
+
+    def test_premium_cache(self):
+        """
+        Test that cached premiums match the pricing, up to the rounding of the parameters, and keep the trees
+        """
+        cache = PricingCache()
+        kwargs = dict(strike=52, maturity=2, initial_price=50, steps=50, volatility=0.3, is_put=True, is_american=True)
+        premium = BinomialCRROption(**kwargs).price()
+        self.assertEqual(BinomialCRROption(**kwargs).price(cache=cache), premium)
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        # Parameters are rounded, so floating point noise hits the cache
+        option = BinomialCRROption(**dict(kwargs, initial_price=50 + 1e-13))
+        self.assertEqual(option.price(cache=cache), premium)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # The payoff tree is cached, so the hedge ratios are available after a hit
+        uncached = BinomialCRROption(**kwargs)
+        uncached.price()
+        self.assertEqual(option.calc_hedge_ratios(1)[0][0], uncached.calc_hedge_ratios(1)[0][0])
+        self.assertEqual(option.greeks()['delta'], uncached.greeks()['delta'])
+
+    def test_lattice_cache(self):
+        """
+        Test that options and futures on the same tree share its cached, read-only lattices
+        """
+        cache = PricingCache()
+        for strike in (45, 50, 55):
+            option = BinomialTreeOption(strike=strike, maturity=2, initial_price=50, steps=20,
+                                        price_changes=(1.1, 0.9), is_american=True)
+            uncached = BinomialTreeOption(strike=strike, maturity=2, initial_price=50, steps=20,
+                                          price_changes=(1.1, 0.9), is_american=True).price()
+            self.assertAlmostEqual(option.price(premium_only=True, cache=cache), uncached, 12)
+        self.assertEqual((cache.lattice_hits, cache.lattice_misses), (2, 1))
+        self.assertFalse(option.price_tree.data.flags.writeable)
+
+        futures = BinomialTreeFutures(initial_price=50, maturity=2, steps=20, probs=(None, None),
+                                      price_changes=(1.1, 0.9))
+        self.assertAlmostEqual(futures.price(cache=cache), futures.price(), 12)
+        self.assertEqual(cache.lattice_hits, 3)
+
+    def test_eviction(self):
+        """
+        Test that the least recently used premiums are evicted beyond the size of the cache
+        """
+        cache = PricingCache(maxsize=2, max_lattices=1)
+        options = [BinomialCRROption(strike=strike, maturity=1, initial_price=50, steps=10) for strike in (45, 50, 55)]
+        for option in options:
+            option.price(cache=cache)
+        self.assertEqual(len(cache), 2)
+        options[0].price(cache=cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+        options[2].price(cache=cache)
+        self.assertEqual(cache.hits, 1)
+
+        cache.clear()
+        self.assertEqual((len(cache), cache.hits, cache.misses), (0, 0, 0))
+        with self.assertRaises(ValueError):
+            PricingCache(maxsize=0)
+
+    def test_uncached_trees(self):
+        """
+        Test that trees given directly are priced without the cache
+        """
+        cache = PricingCache()
+        option = BinomialTreeOption(strike=52, maturity=2, steps=2, price_tree=[[50], [60, 40], [72, 48, 32]],
+                                    probs=(0.5, 0.5), is_put=True)
+        self.assertEqual(option.price(cache=cache), option.price())
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+import sys
+import os
+import contextlib
+import csv
+import importlib.util
+import io
+import tempfile
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer import BinomialTreeFutures
+from binompricer.CommandLine import main, price_file
+
+header = ['trade_id', 'model', 'underlying', 'initial_price', 'strike', 'int_rate', 'maturity', 'steps',
+          'volatility', 'u', 'd', 'is_put', 'is_american']
+rows = [['T1', 'crr', 'ABC', '50', '52', '0.05', '2', '50', '0.3', '', '', 'true', 'true'],
+        ['T2', 'crr', 'ABC', '50', '48', '0.05', '2', '50', '0.3', '', '', 'false', ''],
+        ['T3', 'lr', 'XYZ', '100', '95', '0.03', '1', '51', '0.2', '', '', '1', '0'],
+        ['T4', 'futures', '', '100', '', '', '1', '10', '', '1.1', '0.9', '', '']]
+contracts = [BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=50, volatility=0.3,
+                               is_put=True, is_american=True),
+             BinomialCRROption(initial_price=50, strike=48, int_rate=0.05, maturity=2, steps=50, volatility=0.3),
+             BinomialLROption(initial_price=100, strike=95, int_rate=0.03, maturity=1, steps=51, volatility=0.2,
+                              is_put=True),
+             BinomialTreeFutures(initial_price=100, maturity=1, steps=10, price_changes=[1.1, 0.9], probs=[None, None])]
+
+
+def delta(contract):
+    """
+    Returns the hedge ratio at the first step of a priced contract
+    """
+    values = contract.futures_tree[1] if isinstance(contract, BinomialTreeFutures) else contract.payoff_tree[1]
+    prices = contract.price_tree[1]
+    return (values[0] - values[1]) / (prices[0] - prices[1])
+
+
+class CommandLineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = os.path.join(self.directory.name, 'contracts.csv')
+        with open(self.input, 'w', newline='') as file:
+            csv.writer(file).writerows([header] + rows)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_price_csv(self):
+        """
+        Test that pricing a CSV file in chunks matches pricing each contract, and keeps the other columns
+        """
+        output = os.path.join(self.directory.name, 'premiums.csv')
+        self.assertEqual(price_file(self.input, output, chunk_size=3, log=None), len(rows))
+        with open(output, newline='') as file:
+            priced = list(csv.DictReader(file))
+        self.assertEqual([row['trade_id'] for row in priced], ['T1', 'T2', 'T3', 'T4'])
+        for contract, row in zip(contracts, priced):
+            self.assertAlmostEqual(contract.price(), float(row['premium']), 10)
+            self.assertAlmostEqual(delta(contract), float(row['delta']), 10)
+
+    def test_main(self):
+        """
+        Test the command-line arguments and the errors of the command
+        """
+        output = os.path.join(self.directory.name, 'premiums.csv')
+        self.assertEqual(main([self.input, '-o', output, '--quiet', '--no-deltas']), 0)
+        with open(output, newline='') as file:
+            priced = list(csv.DictReader(file))
+        self.assertNotIn('delta', priced[0])
+        self.assertAlmostEqual(contracts[0].price(), float(priced[0]['premium']), 10)
+        with self.assertRaises(SystemExit):
+            main([self.input, '-o', output, '--quiet', '--chunk-size', '0'])
+
+    def test_empty_values(self):
+        """
+        Test that empty model, tree method and underlying cells take their defaults
+        """
+        output = os.path.join(self.directory.name, 'premiums.csv')
+        with open(self.input, 'w', newline='') as file:
+            csv.writer(file).writerows([header,
+                                        ['T1', '', '', '50', '52', '0.05', '2', '4', '', '1.2', '0.8', '1', ''],
+                                        ['T2', 'crr', '', '50', '52', '0.05', '2', '', '', '', '', '', ''],
+                                        []])
+        price_file(self.input, output, log=None)
+        with open(output, newline='') as file:
+            priced = list(csv.DictReader(file))
+        self.assertEqual(len(priced), 2)
+        self.assertAlmostEqual(float(priced[0]['premium']),
+                               BinomialTreeOption(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=4,
+                                                  price_changes=[1.2, 0.8], is_put=True).price(), 10)
+        self.assertAlmostEqual(float(priced[1]['premium']),
+                               BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2).price(), 10)
+
+    def test_invalid_input(self):
+        """
+        Test that missing columns, missing required values and rows of the wrong length are reported
+        without a traceback
+        """
+        output = os.path.join(self.directory.name, 'premiums.csv')
+        inputs = {"no column for the required parameters: maturity": [[name for name in header if name != 'maturity'],
+                                                                       ['T1', 'crr', 'ABC', '50', '52', '0.05', '50',
+                                                                        '0.3', '', '', 'true', 'true']],
+                  "Contract 2 has no value for 'strike'": [header, rows[0], rows[1][:4] + [''] + rows[1][5:]],
+                  "Line 3 has 12 values for 13 columns": [header, rows[0], rows[1][:-1]]}
+        for message, content in inputs.items():
+            with open(self.input, 'w', newline='') as file:
+                csv.writer(file).writerows(content)
+            with self.assertRaisesRegex(ValueError, message):
+                price_file(self.input, output, log=None)
+            with contextlib.redirect_stderr(io.StringIO()) as stderr:
+                with self.assertRaises(SystemExit) as context:
+                    main([self.input, '-o', output, '--quiet'])
+            self.assertEqual(context.exception.code, 1)
+            self.assertIn(message, stderr.getvalue())
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'), "pyarrow is not installed")
+    def test_price_parquet(self):
+        """
+        Test that a CSV file priced to Parquet, and the Parquet file priced again, give the same premiums
+        """
+        import pyarrow.parquet as pq
+
+        first = os.path.join(self.directory.name, 'first.parquet')
+        second = os.path.join(self.directory.name, 'second.csv')
+        price_file(self.input, first, chunk_size=2, log=None)
+        table = pq.read_table(first).drop(['premium', 'delta'])
+        pq.write_table(table, first)
+        price_file(first, second, chunk_size=2, log=None)
+        with open(second, newline='') as file:
+            priced = list(csv.DictReader(file))
+        for contract, row in zip(contracts, priced):
+            self.assertAlmostEqual(contract.price(), float(row['premium']), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
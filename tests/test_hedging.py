@@ -12,6 +12,9 @@ project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_dir)
 
 from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer.Batch import price_trees
 
 
 class MyTestCase(unittest.TestCase):
@@ -26,6 +29,62 @@ class MyTestCase(unittest.TestCase):
         _ = eu_call_option.price()
         eu_call_hedge_ratios = eu_call_option.calc_hedge_ratios()
         self.assertTrue(utils.lists_are_almost_equal(results, eu_call_hedge_ratios, 4))
+        # Hedge ratios are cached and do not grow with repeated calls
+        self.assertIs(eu_call_option.calc_hedge_ratios(), eu_call_hedge_ratios)
+        self.assertEqual(len(eu_call_option.calc_hedge_ratios()), 3)
+        self.assertTrue(utils.lists_are_almost_equal(results[:2], eu_call_option.calc_hedge_ratios(levels=2), 4))
+
+    def test_first_hedge_ratios(self):
+        """
+        Tests that the hedge ratios of the first levels match those of the full tree
+        """
+        am_put_option = BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2,
+                                          steps=20, volatility=0.3, is_put=True, is_american=True)
+        _ = am_put_option.price()
+        first_hedge_ratios = am_put_option.calc_hedge_ratios(levels=3)
+        self.assertEqual(len(first_hedge_ratios), 3)
+        hedge_ratios = am_put_option.calc_hedge_ratios()
+        self.assertEqual(len(hedge_ratios), 20)
+        self.assertEqual(first_hedge_ratios.tolist(), [level.tolist() for level in hedge_ratios[:3]])
+        _ = am_put_option.price()
+        self.assertIsNot(am_put_option.calc_hedge_ratios(), hedge_ratios)
+        with self.assertRaisesRegex(ValueError, "The levels of the hedge ratios have to be between 1 and 'steps'."):
+            am_put_option.calc_hedge_ratios(levels=21)
+
+    def test_greeks(self):
+        """
+        Tests the greeks of a European put against the Black-Scholes greeks
+        """
+        bs_greeks = {'delta': -0.36114864954945947, 'gamma': 0.017655403110593097, 'theta': -0.7453542073831172,
+                     'vega': 26.48310466588965, 'rho': -49.635145702344246}
+        eu_put_option = BinomialLROption(initial_price=50, strike=52, int_rate=0.05, maturity=2,
+                                         steps=101, volatility=0.3, is_put=True)
+        greeks = eu_put_option.greeks()
+        self.assertAlmostEqual(greeks['delta'], bs_greeks['delta'], 3)
+        self.assertAlmostEqual(greeks['gamma'], bs_greeks['gamma'], 3)
+        self.assertAlmostEqual(greeks['theta'], bs_greeks['theta'], 2)
+        self.assertAlmostEqual(greeks['vega'], bs_greeks['vega'], 1)
+        self.assertAlmostEqual(greeks['rho'], bs_greeks['rho'], 1)
+
+        # The price changes of the base tree are given, so there is no vega
+        params = dict(initial_price=50, strike=52, maturity=2, steps=20, price_changes=[1.1, 0.9], is_put=True)
+        greeks = BinomialTreeOption(int_rate=0.05, **params).greeks()
+        self.assertIsNone(greeks['vega'])
+        rho = (BinomialTreeOption(int_rate=0.0501, **params).price()
+               - BinomialTreeOption(int_rate=0.0499, **params).price()) / 0.0002
+        self.assertAlmostEqual(greeks['rho'], rho, 8)
+
+    def test_price_trees(self):
+        """
+        Tests that the batch of bumped trees reproduces the premiums of the pricing classes
+        """
+        for is_american in (False, True):
+            for smoothing in (None, 'bbs'):
+                option = BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=50,
+                                           volatility=0.3, is_put=True, is_american=is_american, smoothing=smoothing)
+                premium = price_trees(50, option.u, option.d, 0.05, 0, option.dt, 52, 50, True,
+                                      is_american, 0.3, smoothing)
+                self.assertAlmostEqual(option.price(), premium.item(), 10)
 
 
 if __name__ == '__main__':
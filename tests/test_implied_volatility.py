@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+import numpy as np
+
+from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer import implied_volatility
+
+
+class ImpliedVolatilityTest(unittest.TestCase):
+
+    def test_implied_volatility(self):
+        """
+        Test that the implied volatilities of tree premiums recover the volatilities of the trees
+        """
+        strikes = np.array([40, 45, 50, 55, 60, 50])
+        maturities = np.array([0.5, 1, 2, 1, 0.25, 2])
+        volatilities = np.array([0.2, 0.35, 0.3, 0.25, 0.5, 0.4])
+        is_put = np.array([False, True, True, False, True, False])
+        is_american = np.array([False, True, False, True, True, False])
+        for model in (BinomialCRROption, BinomialLROption):
+            prices = [model(initial_price=50, strike=strike, int_rate=0.05, maturity=maturity, steps=51,
+                            volatility=volatility, is_put=put, is_american=american).price(premium_only=True)
+                      for strike, maturity, volatility, put, american
+                      in zip(strikes, maturities, volatilities, is_put, is_american)]
+            vols = implied_volatility(prices, strikes, maturities, 50, int_rate=0.05, is_put=is_put,
+                                      is_american=is_american, steps=51, model=model, tol=1e-9)
+            np.testing.assert_allclose(vols, volatilities, atol=1e-6)
+
+    def test_unsolvable_prices(self):
+        """
+        Test that prices below the intrinsic value and above the stock price have no implied volatility
+        """
+        vols = implied_volatility([0.5, 60, 5], [40, 50, 50], 1, 50, is_american=True)
+        self.assertTrue(np.isnan(vols[0]))
+        self.assertTrue(np.isnan(vols[1]))
+        self.assertFalse(np.isnan(vols[2]))
+
+    def test_implied_volatility_model(self):
+        """
+        Test for ValueError when the price changes of the model do not depend on the volatility
+        """
+        with self.assertRaises(ValueError):
+            implied_volatility([5], [50], 1, 50, model=BinomialTreeOption)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import Kernels
+
+
+class KernelsTest(unittest.TestCase):
+
+    def tearDown(self):
+        Kernels.set_backend('numba' if Kernels.HAS_NUMBA else 'numpy')
+
+    def test_invalid_backend(self):
+        """
+        Test for ValueError when the backend is not known
+        """
+        with self.assertRaisesRegex(ValueError, "The backend can only be 'numpy' or 'numba'."):
+            Kernels.set_backend('fortran')
+
+    @unittest.skipUnless(Kernels.HAS_NUMBA, "numba is not installed")
+    def test_compiled_american(self):
+        """
+        Test that the compiled American backward induction matches the NumPy one
+        """
+        price_tree = [[100], [115, 87], [133, 100, 75], [152, 115, 87, 65]]
+        int_rates_tree = [[0.02469261], [0.01980263, 0.0295588], [0.00995033, 0.02469261, 0.03440143]]
+        options = [BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2,
+                                     steps=100, volatility=0.3, is_put=True, is_american=True),
+                   BinomialTreeOption(initial_price=50, strike=48, int_rate=0.05, maturity=2, steps=10,
+                                      price_changes=[2, 1], tree_method='add', is_american=True),
+                   BinomialTreeOption(price_tree=price_tree, int_rates_tree=int_rates_tree, strike=100,
+                                      maturity=3, is_put=True, is_american=True)]
+        for option in options:
+            Kernels.set_backend('numpy')
+            numpy_price = option.price()
+            numpy_payoffs = option.payoff_tree.data.copy()
+            Kernels.set_backend('numba')
+            self.assertAlmostEqual(option.price(), numpy_price, 10)
+            for compiled, expected in zip(option.payoff_tree.data, numpy_payoffs):
+                self.assertAlmostEqual(compiled, expected, 10)
+
+    @unittest.skipUnless(Kernels.HAS_NUMBA, "numba is not installed")
+    def test_compiled_control_variate(self):
+        """
+        Test that the compiled fused American and European backward induction matches the NumPy one
+        """
+        for kwargs in (dict(is_put=True), dict(is_put=False, dividents=0.08), dict(is_put=True, smoothing='bbs')):
+            option = BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=101,
+                                       volatility=0.3, is_american=True, **kwargs)
+            Kernels.set_backend('numpy')
+            numpy_premium = option.price_control_variate()
+            Kernels.set_backend('numba')
+            self.assertAlmostEqual(option.price_control_variate(), numpy_premium, 10)
+
+    @unittest.skipUnless(Kernels.HAS_NUMBA, "numba is not installed")
+    def test_compiled_batch(self):
+        """
+        Test that the compiled backward induction of a batch of trees matches the NumPy one
+        """
+        option = BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=100,
+                                   volatility=0.3, is_american=True, divident_schedule=[(0.5, 1.0)])
+        for smoothing in (None, 'bbs'):
+            option.smoothing = smoothing
+            Kernels.set_backend('numpy')
+            numpy_greeks = option.greeks()
+            Kernels.set_backend('numba')
+            compiled_greeks = option.greeks()
+            self.assertAlmostEqual(compiled_greeks['vega'], numpy_greeks['vega'], 8)
+            self.assertAlmostEqual(compiled_greeks['rho'], numpy_greeks['rho'], 8)
+
+    @unittest.skipUnless(Kernels.HAS_NUMBA, "numba is not installed")
+    def test_compiled_premium_only(self):
+        """
+        Test that the premium only mode matches the full trees with the compiled and the NumPy backends
+        """
+        params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=101, volatility=0.3)
+        for kwargs in (dict(is_put=True, is_american=True), dict(is_put=False, is_american=True, dividents=0.08),
+                       dict(is_put=True, is_american=True, smoothing='bbs'),
+                       dict(is_put=False, is_american=True, divident_schedule=[(0.5, 1.0), (1.5, 2.0)]),
+                       dict(is_put=True, is_american=False, divident_schedule=[(0.5, 1.0)])):
+            option = BinomialCRROption(**params, **kwargs)
+            full_premium = option.price()
+            for backend in ('numpy', 'numba'):
+                Kernels.set_backend(backend)
+                self.assertAlmostEqual(option.price(premium_only=True), full_premium, 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+
+import numpy as np
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from binompricer import TriangularLattice
+from binompricer import TrinomialLattice
+
+
+class TriangularLatticeTest(unittest.TestCase):
+
+    def test_levels_are_views(self):
+        """
+        Test that the levels of the lattice are views of one contiguous array
+        """
+        lattice = TriangularLattice.from_levels([[1], [2, 3], [4, 5, 6]])
+        self.assertEqual(len(lattice), 3)
+        self.assertEqual(lattice.data.tolist(), [1, 2, 3, 4, 5, 6])
+        self.assertEqual(lattice[-1].tolist(), [4, 5, 6])
+        lattice[1][0] = 7
+        self.assertEqual(lattice.data[1], 7)
+        self.assertEqual(lattice.tolist(), [[1], [7, 3], [4, 5, 6]])
+        self.assertEqual([level.tolist() for level in lattice[::-1]], [[4, 5, 6], [7, 3], [1]])
+
+    def test_invalid_lattice(self):
+        """
+        Test for ValueError when the levels do not form a recombining tree
+        """
+        err_recomb_tree_nodes = ("Assuming the tree is recombining, the number of nodes"
+                                 " should start from one and increase by one.")
+        with self.assertRaisesRegex(ValueError, err_recomb_tree_nodes):
+            _ = TriangularLattice.from_levels([[1], [2, 3, 4]])
+        with self.assertRaises(ValueError):
+            _ = TriangularLattice(2, data=np.zeros(5))
+        with self.assertRaises(IndexError):
+            _ = TriangularLattice(2)[3]
+
+
+
+class TrinomialLatticeTest(unittest.TestCase):
+
+    def test_subtree(self):
+        """
+        Test that the subtree of a trinomial lattice holds the three children of every node
+        """
+        levels = [[0], [1, 2, 3], [4, 5, 6, 7, 8], [9, 10, 11, 12, 13, 14, 15]]
+        lattice = TrinomialLattice.from_levels(levels)
+        self.assertEqual(lattice.data.tolist(), list(range(16)))
+        subtree = lattice.subtree(1, 2)
+        self.assertIsInstance(subtree, TrinomialLattice)
+        self.assertEqual(subtree.tolist(), [[3], [6, 7, 8], [11, 12, 13, 14, 15]])
+        self.assertEqual(lattice.subtree(2, 4, in_place=True).tolist(), [[8], [13, 14, 15]])
+        with self.assertRaises(IndexError):
+            _ = TrinomialLattice(3).subtree(1, 3)
+
+    def test_invalid_lattice(self):
+        """
+        Test for errors when the levels do not form a trinomial tree, and for the binomial children
+        """
+        with self.assertRaisesRegex(ValueError, "the number of nodes should start from one and increase by two."):
+            _ = TrinomialLattice.from_levels([[1], [2, 3]])
+        with self.assertRaises(TypeError):
+            _ = TrinomialLattice(2).upper_nodes()
+        with self.assertRaises(TypeError):
+            _ = TrinomialLattice(2).lower_nodes()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import sys
+import os
+import numpy as np
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer import BinomialTreeFutures
+from binompricer import PortfolioPricer
+from binompricer.Portfolio import pack_specs, pack_columns
+
+specs = [{'model': 'crr', 'underlying': 'ABC', 'initial_price': 50, 'strike': 52, 'int_rate': 0.05, 'maturity': 2,
+          'steps': 50, 'volatility': 0.3, 'is_put': True, 'is_american': True},
+         {'model': 'crr', 'underlying': 'ABC', 'initial_price': 50, 'strike': 48, 'int_rate': 0.05, 'maturity': 2,
+          'steps': 50, 'volatility': 0.3},
+         {'model': 'lr', 'underlying': 'XYZ', 'initial_price': 100, 'strike': 95, 'int_rate': 0.03, 'maturity': 1,
+          'steps': 51, 'volatility': 0.2, 'is_put': True},
+         {'model': 'tree', 'initial_price': 80, 'strike': 80, 'int_rate': 0.05, 'maturity': 3,
+          'steps': 3, 'probs': [0.5, 0.5]},
+         {'model': 'tree', 'initial_price': 50, 'strike': 52, 'maturity': 2, 'steps': 4,
+          'price_changes': [2, 1], 'tree_method': 'add', 'is_american': True},
+         {'model': 'futures', 'initial_price': 100, 'maturity': 1, 'steps': 10, 'price_changes': [1.1, 0.9]}]
+contracts = [BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=50, volatility=0.3,
+                               is_put=True, is_american=True),
+             BinomialCRROption(initial_price=50, strike=48, int_rate=0.05, maturity=2, steps=50, volatility=0.3),
+             BinomialLROption(initial_price=100, strike=95, int_rate=0.03, maturity=1, steps=51, volatility=0.2,
+                              is_put=True),
+             BinomialTreeOption(initial_price=80, strike=80, int_rate=0.05, maturity=3, steps=3, probs=[0.5, 0.5]),
+             BinomialTreeOption(initial_price=50, strike=52, maturity=2, steps=4, price_changes=[2, 1],
+                                tree_method='add', is_american=True),
+             BinomialTreeFutures(initial_price=100, maturity=1, steps=10, price_changes=[1.1, 0.9], probs=[None, None])]
+
+
+class PortfolioPricerTest(unittest.TestCase):
+
+    def test_portfolio_serial(self):
+        """
+        Test that pricing a portfolio in process matches pricing each contract
+        """
+        with PortfolioPricer(max_workers=1) as pricer:
+            premiums = pricer.price(specs)
+        for contract, premium in zip(contracts, premiums):
+            self.assertAlmostEqual(contract.price(), premium, 10)
+
+    def test_portfolio_pool(self):
+        """
+        Test that pricing a portfolio in a pool of processes matches pricing each contract
+        """
+        with PortfolioPricer(max_workers=2) as pricer:
+            premiums = pricer.price(specs)
+            chunks = pricer.split(pack_specs(specs))
+        for contract, premium in zip(contracts, premiums):
+            self.assertAlmostEqual(contract.price(), premium, 10)
+        # Contracts on the same underlying are priced in the same chunk
+        self.assertTrue(any({0, 1} <= set(chunk) for chunk in chunks))
+        self.assertEqual(sorted(i for chunk in chunks for i in chunk), list(range(len(specs))))
+
+    def test_portfolio_deltas(self):
+        """
+        Test that the deltas of a portfolio match the hedge ratios at the first step of each contract
+        """
+        with PortfolioPricer(max_workers=1) as pricer:
+            premiums, deltas = pricer.price(specs, with_deltas=True)
+        for contract, premium, delta in zip(contracts, premiums, deltas):
+            self.assertAlmostEqual(contract.price(), premium, 10)
+            if isinstance(contract, BinomialTreeFutures):
+                prices, values = contract.price_tree[1], contract.futures_tree[1]
+            else:
+                prices, values = contract.price_tree[1], contract.payoff_tree[1]
+            self.assertAlmostEqual((values[0] - values[1]) / (prices[0] - prices[1]), delta, 10)
+
+    def test_pack_columns(self):
+        """
+        Test that packing columns of specifications matches packing the specifications one by one
+        """
+        columns = {'model': ['crr', 'crr', 'lr'], 'underlying': ['ABC', 'ABC', 'XYZ'],
+                   'initial_price': [50, 50, 100], 'strike': [52, 48, 95], 'int_rate': [0.05, 0.05, 0.03],
+                   'maturity': [2, 2, 1], 'steps': [50, 50, 51], 'volatility': [0.3, 0.3, 0.2],
+                   'is_put': [True, False, True], 'is_american': [True, False, False]}
+        records, expected = pack_columns(columns), pack_specs(specs[:3])
+        for name in expected.dtype.names:
+            np.testing.assert_array_equal(records[name], expected[name])
+        with self.assertRaisesRegex(ValueError, "Unknown contract parameter 'spot'."):
+            pack_columns({'spot': [100]})
+
+    def test_invalid_spec(self):
+        """
+        Test for ValueError when a contract cannot be priced in a portfolio
+        """
+        with self.assertRaisesRegex(ValueError, "The model can only be 'tree', 'crr', 'lr' or 'futures'."):
+            PortfolioPricer(max_workers=1).price([{'model': 'trinomial'}])
+        with self.assertRaisesRegex(ValueError, "Unknown contract parameter 'spot'."):
+            PortfolioPricer(max_workers=1).price([{'spot': 100}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import math
 import sys
 import os
 import utils
@@ -12,6 +13,8 @@ from binompricer import BinomialTreeOption
 from binompricer import BinomialCRROption
 from binompricer import BinomialLROption
 from binompricer import BinomialTreeFutures
+from binompricer import RichardsonOption
+from binompricer.BlackScholes import bs_price, norm_cdf
 
 
 class BinomialTreeTest(unittest.TestCase):
@@ -97,6 +100,339 @@ class BinomialTreeTest(unittest.TestCase):
         _ = eu_call_option.price()
         self.assertTrue(utils.lists_are_almost_equal(results, eu_call_option.payoff_tree, 4))
 
+    def test_price_batch(self):
+        """
+        Tests that batch pricing of a chain matches pricing each contract separately
+        """
+        strikes = [45, 50, 52, 55, 52]
+        is_put = [True, False, True, False, True]
+        is_american = [True, True, False, False, True]
+        chain = BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2,
+                                  steps=50, volatility=0.3)
+        batch_prices = chain.price_batch(strikes, is_put, is_american)
+
+        for strike, put, american, batch_price in zip(strikes, is_put, is_american, batch_prices):
+            option = BinomialCRROption(initial_price=50, strike=strike, int_rate=0.05, maturity=2,
+                                       steps=50, volatility=0.3, is_put=put, is_american=american)
+            self.assertAlmostEqual(option.price(), batch_price, 10)
+
+    def test_premium_only(self):
+        """
+        Tests that the premium only mode gives the same premium as the full trees
+        """
+        price_tree = [[100], [115, 87], [133, 100, 75], [152, 115, 87, 65]]
+        int_rates_tree = [[0.02469261], [0.01980263, 0.0295588], [0.00995033, 0.02469261, 0.03440143]]
+        options = [BinomialCRROption(initial_price=50, strike=52, int_rate=0.05, maturity=2,
+                                     steps=30, volatility=0.3, is_put=True, is_american=True),
+                   BinomialTreeOption(initial_price=50, strike=52, int_rate=0.05, maturity=2, steps=4,
+                                      price_changes=[2, 1], tree_method='add', is_american=True),
+                   BinomialTreeOption(price_tree=price_tree, int_rates_tree=int_rates_tree, strike=100,
+                                      maturity=3, is_put=True, is_american=True)]
+        for option in options:
+            lean_price = option.price(premium_only=True)
+            if option.tree_method != 'direct':
+                self.assertIsNone(option.price_tree)
+            with self.assertRaises(ValueError):
+                option.calc_hedge_ratios()
+            self.assertAlmostEqual(lean_price, option.price(), 10)
+
+    def test_richardson_extrapolation(self):
+        """
+        Tests that Richardson extrapolation of LR trees beats a single tree with more nodes
+        """
+        # Black-Scholes price of the European put
+        eu_put_price = 6.760140373699151
+        params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=2, volatility=0.3, is_put=True)
+        eu_lr_put_option = RichardsonOption(BinomialLROption, steps=51, **params)
+        eu_lr_put_price = eu_lr_put_option.price()
+        self.assertEqual(eu_lr_put_option.steps_pair, (51, 103))
+        self.assertLess(abs(eu_lr_put_price - eu_put_price), 1e-6)
+        self.assertLess(abs(eu_lr_put_price - eu_put_price), eu_lr_put_option.error)
+
+        fine_lr_put_price = BinomialLROption(steps=301, **params).price(premium_only=True)
+        self.assertLess(abs(eu_lr_put_price - eu_put_price), abs(fine_lr_put_price - eu_put_price))
+
+        am_lr_put_option = RichardsonOption(BinomialLROption, steps=25, tol=1e-4, is_american=True, **params)
+        am_lr_put_price = am_lr_put_option.price()
+        self.assertLess(am_lr_put_option.error, 1e-4)
+        reference_price = BinomialLROption(steps=2001, is_american=True, **params).price(premium_only=True)
+        self.assertAlmostEqual(am_lr_put_price, reference_price, 3)
+        # A plain tree with ten times the nodes of all the extrapolated trees is less accurate
+        # than the extrapolation; the reference is the premium of test_control_variate
+        reference = 7.47203
+        for option_class, steps in ((BinomialLROption, 25), (BinomialCRROption, 50)):
+            am_put_option = RichardsonOption(option_class, steps=steps, tol=1e-4, is_american=True, **params)
+            error = abs(am_put_option.price() - reference)
+            self.assertLess(error, 1e-4)
+            plain_steps = int(math.sqrt(2 * 10 * am_put_option.nodes))
+            plain_price = option_class(steps=plain_steps, is_american=True, **params).price(premium_only=True)
+            self.assertLess(error, abs(plain_price - reference))
+
+        with self.assertRaisesRegex(ValueError, "Richardson extrapolation needs an option class"):
+            _ = RichardsonOption(BinomialTreeOption, probs=[0.2, 0.2], **params)
+
+    def test_bbs_smoothing(self):
+        """
+        Tests the Binomial Black-Scholes smoothing of CRR trees, with and without Richardson extrapolation
+        """
+        eu_put_price = 6.760140373699151
+        params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=2, volatility=0.3, is_put=True)
+        errors = [BinomialCRROption(steps=steps, smoothing='bbs', **params).price() - eu_put_price
+                  for steps in (50, 100, 200)]
+        # Smooth and monotone convergence
+        self.assertTrue(errors[0] > errors[1] > errors[2] > 0)
+        self.assertAlmostEqual(errors[0] / errors[1], 2, 1)
+
+        bbs_put_option = BinomialCRROption(steps=50, smoothing='bbs', is_american=True, **params)
+        self.assertAlmostEqual(bbs_put_option.price(), bbs_put_option.price(premium_only=True), 10)
+        self.assertAlmostEqual(bbs_put_option.price(), bbs_put_option.price_batch([52])[0], 10)
+
+        bbsr_put_option = RichardsonOption(BinomialCRROption, steps=50, smoothing='bbs', **params)
+        self.assertLess(abs(bbsr_put_option.price() - eu_put_price), 1e-4)
+
+        # CRR trees are smoothed by default, and the error estimate bounds the error for strikes off the nodes
+        for initial_price, strike, maturity in ((100, 95, 0.5), (50, 52, 2), (90, 104, 1), (110, 100, 0.5)):
+            crr_put_option = RichardsonOption(BinomialCRROption, steps=50, tol=1e-4, initial_price=initial_price,
+                                              strike=strike, int_rate=0.05, maturity=maturity, volatility=0.3,
+                                              is_put=True)
+            error = abs(crr_put_option.price() - bs_price(initial_price, strike, maturity, 0.05, 0.3, 0, True))
+            self.assertEqual(crr_put_option.kwargs['smoothing'], 'bbs')
+            self.assertLessEqual(crr_put_option.error, 1e-4)
+            self.assertLess(error, crr_put_option.error)
+        with self.assertRaisesRegex(ValueError, "Richardson extrapolation of an oscillating model needs"):
+            _ = RichardsonOption(BinomialCRROption, smoothing=None, **params)
+
+        with self.assertRaisesRegex(ValueError, "Smoothing can only be None or 'bbs'."):
+            _ = BinomialCRROption(smoothing='spline', **params)
+        with self.assertRaisesRegex(ValueError, "The 'bbs' smoothing needs a 'multiply' tree"):
+            _ = BinomialTreeOption(initial_price=50, strike=52, maturity=2, probs=[0.2, 0.2], smoothing='bbs')
+        with self.assertRaisesRegex(ValueError, "The deltas of a 'bbs' tree need at least 2 steps."):
+            _ = BinomialCRROption(steps=1, smoothing='bbs', **params).price_batch([52], with_deltas=True)
+        self.assertAlmostEqual(BinomialCRROption(steps=1, smoothing='bbs', **params).price_batch([52])[0],
+                               eu_put_price, 10)
+
+    def test_norm_cdf(self):
+        """
+        Tests the vectorized normal distribution function against the error function of the math module
+        """
+        x = np.concatenate([np.linspace(-38, 38, 20001), [-np.inf, np.inf]])
+        expected = np.array([0.5 * math.erfc(-value / math.sqrt(2)) for value in x])
+        cdf = norm_cdf(x.reshape(-1, 1))
+        self.assertEqual(cdf.shape, (len(x), 1))
+        np.testing.assert_allclose(cdf[:, 0], expected, rtol=1e-14, atol=1e-300)
+        self.assertEqual(norm_cdf(0.3), 0.5 * math.erfc(-0.3 / math.sqrt(2)))
+
+    def test_control_variate(self):
+        """
+        Tests that the European control variate takes most of the discretization error off an American premium
+        """
+        # Premium of the American put to about 1e-5, from extrapolated trees with 8,000 and 16,000 steps
+        reference = 7.47203
+        params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=2, volatility=0.3, is_put=True)
+        for steps in (100, 200):
+            option = BinomialCRROption(steps=steps, is_american=True, smoothing='bbs', **params)
+            error = abs(option.price() - reference)
+            self.assertLess(abs(option.price_control_variate() - reference), error / 4)
+            self.assertEqual(option.payoff_tree, [])
+        self.assertLess(abs(BinomialCRROption(steps=50, is_american=True, **params).price_control_variate()
+                            - reference), 5e-3)
+
+        european = BinomialCRROption(steps=100, **params)
+        self.assertAlmostEqual(european.price_control_variate(), bs_price(50, 52, 2, 0.05, 0.3, 0, True), 10)
+        with self.assertRaisesRegex(ValueError, "The control variate needs a 'multiply' tree"):
+            BinomialTreeOption(initial_price=50, strike=52, maturity=2, steps=10, price_changes=[2, 1],
+                               tree_method='add', is_american=True).price_control_variate()
+
+    def test_update_spot(self):
+        """
+        Tests the repricing of options and futures after a move of the initial price
+        """
+        params = dict(strike=52, int_rate=0.05, maturity=2, steps=50, is_put=True, is_american=True)
+        for model, kwargs in ((BinomialCRROption, dict(volatility=0.3)), (BinomialLROption, dict(volatility=0.3)),
+                              (BinomialTreeOption, dict(price_changes=[1.1, 0.9])),
+                              (BinomialTreeOption, dict(price_changes=[1, 0.8], tree_method='add'))):
+            option = model(initial_price=50, **params, **kwargs)
+            option.price()
+            for spot in (51, 47.5):
+                self.assertAlmostEqual(option.update_spot(spot),
+                                       model(initial_price=spot, **params, **kwargs).price(), 10)
+                self.assertEqual(option.initial_price, spot)
+            self.assertEqual(len(option.calc_hedge_ratios()), 50)
+
+        futures_contract = BinomialTreeFutures(initial_price=100, maturity=1, steps=10, int_rate=0.02,
+                                               probs=(None, None), price_changes=(1.1, 0.9))
+        futures_contract.price()
+        self.assertAlmostEqual(futures_contract.update_spot(110),
+                               BinomialTreeFutures(initial_price=110, maturity=1, steps=10, int_rate=0.02,
+                                                   probs=(None, None), price_changes=(1.1, 0.9)).price(), 10)
+
+        option = BinomialTreeOption(strike=52, maturity=2, steps=2, price_tree=[[50], [60, 40], [72, 48, 32]],
+                                    probs=(0.5, 0.5))
+        with self.assertRaisesRegex(ValueError, "The initial price of a price tree"):
+            option.update_spot(51)
+
+    def test_roll(self):
+        """
+        Tests the repricing of options after their time to maturity decays
+        """
+        params = dict(initial_price=50, strike=52, int_rate=0.05, volatility=0.3, is_put=True, is_american=True)
+        option = BinomialCRROption(maturity=1, steps=100, **params)
+        option.price()
+        # Two steps later, the middle node is at the initial price and its payoffs are reused
+        self.assertAlmostEqual(option.roll(0.02), BinomialCRROption(maturity=0.98, steps=98, **params).price(), 10)
+        self.assertEqual((option.steps, option.initial_price), (98, 50))
+        # One step later, the tree is moved to the initial price
+        self.assertAlmostEqual(option.roll(0.01), BinomialCRROption(maturity=0.97, steps=97, **params).price(), 10)
+        self.assertEqual(len(option.calc_hedge_ratios()), 97)
+        # A fraction of a step drifts beyond the tolerance, so the trees are rebuilt
+        self.assertAlmostEqual(option.roll(0.003, tol=1e-4),
+                               BinomialCRROption(maturity=0.967, steps=97, **params).price(), 10)
+
+        # The greeks and spot updates of a rolled tree keep its time step, as a tree built for it does.
+        # A rolled Leisen - Reimer tree is no longer centred on the strike, so only its bumped trees match.
+        for model, names in ((BinomialCRROption, ('delta', 'gamma', 'theta', 'vega', 'rho')),
+                             (BinomialLROption, ('vega', 'rho'))):
+            option = model(maturity=1, steps=101, **params)
+            option.price()
+            option.roll(0.0297, tol=1e-2)
+            self.assertEqual(option.steps, 98)
+            rebuilt = model(maturity=option.dt * 98, steps=98, **params)
+            rebuilt.price()
+            greeks, rebuilt_greeks = option.greeks(), rebuilt.greeks()
+            for name in names:
+                self.assertAlmostEqual(greeks[name], rebuilt_greeks[name], 8)
+            self.assertAlmostEqual(option.update_spot(51),
+                                   model(maturity=option.dt * 98, steps=98, **dict(params, initial_price=51)).price(),
+                                   10)
+
+        # The control variate of a rolled tree is taken over the time the tree spans
+        option = BinomialCRROption(maturity=1, steps=101, **params)
+        option.price()
+        option.roll(0.0297, tol=1e-2)
+        self.assertAlmostEqual(option.price_control_variate(),
+                               BinomialCRROption(maturity=option.dt * 98, steps=98, **params).price_control_variate(),
+                               10)
+
+        option = BinomialTreeOption(maturity=2, steps=20, price_changes=(1, 0.8), tree_method='add',
+                                    int_rates_tree=[[0.05] * (n + 1) for n in range(20)], **params)
+        option.price()
+        self.assertAlmostEqual(option.roll(0.3),
+                               BinomialTreeOption(maturity=1.7, steps=17, price_changes=(1, 0.8), tree_method='add',
+                                                  int_rates_tree=[[0.05] * (n + 1) for n in range(17)],
+                                                  **params).price(), 10)
+
+    def test_int_rates_tree(self):
+        """
+        Tests that a flat interest rates tree prices like a constant interest rate
+        """
+        params = dict(initial_price=50, strike=52, maturity=2, steps=30, price_changes=[1.05, 0.95], is_put=True)
+        int_rates_tree = [[0.05] * (n + 1) for n in range(30)]
+        for is_american in (False, True):
+            self.assertAlmostEqual(BinomialTreeOption(int_rates_tree=int_rates_tree, is_american=is_american,
+                                                      **params).price(),
+                                   BinomialTreeOption(int_rate=0.05, is_american=is_american, **params).price(), 10)
+
+    def test_divident_schedule(self):
+        """
+        Tests the escrowed dividend tree: European premiums converge to Black-Scholes on the initial price
+        net of the present value of the dividends, the price tree recombines and includes the dividends
+        in escrow, and the lean, batch and spot update paths agree with the full tree
+        """
+        schedule = [(0.75, 1.0), (0.25, 1.0), (1.5, 2.0)]
+        params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=1, volatility=0.3)
+        escrowed = 50 - np.exp(-0.05 * 0.25) - np.exp(-0.05 * 0.75)
+        self.assertAlmostEqual(BinomialLROption(steps=501, divident_schedule=schedule, **params).price(),
+                               bs_price(escrowed, 52, 1, 0.05, 0.3, 0, False), 4)
+
+        option = BinomialCRROption(steps=4, divident_schedule=schedule, **params)
+        option.price()
+        u = option.u
+        self.assertEqual(option.divident_schedule, ((0.25, 1.0), (0.75, 1.0), (1.5, 2.0)))
+        self.assertAlmostEqual(option.price_tree[0][0], 50, 10)
+        self.assertAlmostEqual(option.price_tree[2][1], escrowed + np.exp(-0.05 * 0.25), 10)
+        np.testing.assert_allclose(option.price_tree[4], escrowed * u ** np.arange(4, -5, -2), rtol=1e-12)
+
+        for is_american in (False, True):
+            option = BinomialCRROption(steps=100, divident_schedule=schedule, is_american=is_american, **params)
+            premium = option.price()
+            self.assertAlmostEqual(option.price(premium_only=True), premium, 10)
+            self.assertAlmostEqual(option.price_batch([52])[0], premium, 10)
+            greeks = option.greeks()
+            vega = (BinomialCRROption(steps=100, divident_schedule=schedule, is_american=is_american,
+                                      **dict(params, volatility=0.31)).price()
+                    - BinomialCRROption(steps=100, divident_schedule=schedule, is_american=is_american,
+                                        **dict(params, volatility=0.29)).price()) / 0.02
+            self.assertAlmostEqual(greeks['vega'], vega, 8)
+            self.assertAlmostEqual(option.update_spot(51),
+                                   BinomialCRROption(steps=100, divident_schedule=schedule, is_american=is_american,
+                                                     **dict(params, initial_price=51)).price(), 10)
+
+        # An 'add' tree takes its risk-neutral probabilities from the tree net of the escrowed dividends
+        option = BinomialTreeOption(initial_price=50, strike=52, maturity=1, steps=20, price_changes=[0.5, 0.5],
+                                    tree_method='add', divident_schedule=schedule, is_put=True, is_american=True)
+        self.assertAlmostEqual(option.price(premium_only=True), option.price(), 10)
+        net_tree = BinomialTreeOption(initial_price=escrowed, strike=52, maturity=1, steps=20,
+                                      price_changes=[0.5, 0.5], tree_method='add')
+        net_tree.calc_lattices()
+        np.testing.assert_allclose(option.risk_free_probs_up.data, net_tree.risk_free_probs_up.data, rtol=1e-10)
+
+        # Rolling past a dividend drops it from the schedule
+        option = BinomialCRROption(steps=50, divident_schedule=schedule, is_american=True, **params)
+        option.price()
+        self.assertAlmostEqual(option.roll(0.3),
+                               BinomialCRROption(steps=50, divident_schedule=[(0.45, 1.0), (1.2, 2.0)],
+                                                 is_american=True, **dict(params, maturity=0.7)).price(), 10)
+
+        with self.assertRaisesRegex(ValueError, "The escrowed dividends have to be smaller than the initial price."):
+            BinomialCRROption(steps=10, divident_schedule=[(0.5, 60)], **params)
+        with self.assertRaisesRegex(ValueError, "A 'divident_schedule' needs a 'multiply' or 'add' tree"):
+            BinomialTreeOption(strike=52, maturity=2, steps=2, price_tree=[[50], [60, 40], [72, 48, 32]],
+                               probs=(0.5, 0.5), divident_schedule=schedule)
+
+    def test_single_precision(self):
+        """
+        Tests that the cases above priced on float32 lattices stay within the documented relative
+        accuracy of 1e-5 of float64, on lattices of the requested type
+        """
+        price_tree = [[100], [115, 87], [133, 100, 75], [152, 115, 87, 65]]
+        int_rates_tree = [[0.02469261], [0.01980263, 0.0295588], [0.00995033, 0.02469261, 0.03440143]]
+        params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=2)
+        cases = [(BinomialTreeOption, dict(steps=2, probs=[0.2, 0.2], is_put=True, **params)),
+                 (BinomialTreeOption, dict(steps=2, probs=[0.2, 0.2], is_put=True, is_american=True, **params)),
+                 (BinomialTreeOption, dict(initial_price=80, strike=80, int_rate=np.log(1.1), maturity=3, steps=3,
+                                           probs=[0.5, 0.5])),
+                 (BinomialTreeOption, dict(steps=4, price_changes=[2, 1], tree_method='add', is_american=True,
+                                           **params)),
+                 (BinomialTreeOption, dict(price_tree=price_tree, int_rates_tree=int_rates_tree, strike=100,
+                                           maturity=3, is_put=True, is_american=True)),
+                 (BinomialCRROption, dict(steps=2, volatility=0.3, is_put=True, **params)),
+                 (BinomialCRROption, dict(steps=1000, volatility=0.3, is_put=True, is_american=True, **params)),
+                 (BinomialCRROption, dict(steps=1000, volatility=0.3, smoothing='bbs', **params)),
+                 (BinomialCRROption, dict(steps=100, volatility=0.3, divident_schedule=[(0.5, 1.0)],
+                                          is_american=True, **params)),
+                 (BinomialLROption, dict(steps=4, volatility=0.3, is_put=True, is_american=True, **params)),
+                 (BinomialLROption, dict(steps=1001, volatility=0.3, is_put=True, **params))]
+        for model, kwargs in cases:
+            double, single = model(**kwargs), model(dtype=np.float32, **kwargs)
+            premium = double.price()
+            self.assertLess(abs(single.price() / premium - 1), 1e-5)
+            self.assertEqual(single.payoff_tree.data.dtype, np.float32)
+            self.assertEqual(single.price_tree.data.dtype, np.float32)
+            self.assertLess(abs(single.price(premium_only=True) / premium - 1), 1e-5)
+            if double.has_constant_params:
+                np.testing.assert_allclose(single.price_batch([45, 52, 55], [True, False, True], True),
+                                           double.price_batch([45, 52, 55], [True, False, True], True), rtol=1e-5)
+
+        option = BinomialCRROption(steps=1000, volatility=0.3, is_put=True, is_american=True, **params)
+        self.assertLess(abs(BinomialCRROption(steps=1000, volatility=0.3, is_put=True, is_american=True,
+                                              dtype=np.float32, **params).price_control_variate()
+                            / option.price_control_variate() - 1), 1e-5)
+        futures = BinomialTreeFutures(price_tree=price_tree, int_rates_tree=int_rates_tree, maturity=3,
+                                      dtype=np.float32)
+        self.assertAlmostEqual(futures.price() / 107.12, 1, 4)
+        with self.assertRaisesRegex(ValueError, "The 'dtype' of the lattices has to be a floating point type."):
+            BinomialCRROption(steps=10, volatility=0.3, dtype=int, **params)
+
     def test_futures(self):
         """
         Tests the pricing for a futures contract
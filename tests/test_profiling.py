@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+from concurrent.futures import ThreadPoolExecutor
+import tracemalloc
+
+from binompricer import BinomialCRROption
+from binompricer import BinomialTreeFutures
+from binompricer import PhaseProfiler
+from binompricer import Profiling
+
+
+class ProfilingTest(unittest.TestCase):
+
+    def test_phases(self):
+        """
+        Test that the phases of options and futures are timed, traced and aggregated while a profiler is active
+        """
+        records = []
+        option = BinomialCRROption(strike=52, maturity=2, initial_price=50, steps=200, volatility=0.3,
+                                   is_put=True, is_american=True)
+        with PhaseProfiler(callback=lambda phase, measurements: records.append(phase)) as profiler:
+            self.assertIs(Profiling.active_profiler(), profiler)
+            premium = option.price()
+            option.price(premium_only=True)
+            BinomialTreeFutures(initial_price=100, maturity=1, steps=10).price()
+        self.assertIsNone(Profiling.active_profiler())
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(premium, option.price())
+
+        self.assertEqual(records, ['calc_price_tree', 'calc_interest_factors', 'calc_risk_neutral_probs',
+                                   'traverse_tree', 'traverse_tree_lean', 'calc_price_tree',
+                                   'calc_interest_factors', 'calc_risk_neutral_probs', 'traverse_tree'])
+        self.assertEqual(profiler.stats['traverse_tree']['calls'], 2)
+        # The price and payoff trees of the option have 201 * 202 / 2 nodes
+        self.assertGreaterEqual(profiler.stats['calc_price_tree']['bytes'], 201 * 202 // 2 * 8)
+        self.assertGreaterEqual(profiler.stats['traverse_tree']['peak_bytes'], 201 * 202 // 2 * 8)
+        self.assertGreater(profiler.stats['traverse_tree']['allocations'], 0)
+
+        counters = profiler.counters()
+        self.assertEqual(counters['binompricer.traverse_tree.calls'], 2)
+        self.assertIn('binompricer.calc_risk_neutral_probs.wall_time', counters)
+        profiler.reset()
+        self.assertEqual(profiler.counters(), {})
+
+    def test_wall_time_only(self):
+        """
+        Test that only the wall time is recorded without memory tracing
+        """
+        option = BinomialCRROption(strike=52, maturity=2, initial_price=50, steps=20, volatility=0.3)
+        with PhaseProfiler(trace_memory=False) as profiler:
+            option.price()
+        self.assertEqual(set(profiler.stats['traverse_tree']), {'calls', 'wall_time'})
+
+    def test_threads(self):
+        """
+        Test that the phases priced in other threads are recorded, and that only one profiler is active
+        """
+        options = [BinomialCRROption(strike=strike, maturity=1, initial_price=50, steps=50, volatility=0.3)
+                   for strike in range(40, 60)]
+        with PhaseProfiler(trace_memory=False) as profiler:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(lambda option: option.price(), options))
+            with self.assertRaises(ValueError):
+                with PhaseProfiler():
+                    pass
+            self.assertIs(Profiling.active_profiler(), profiler)
+        self.assertIsNone(Profiling.active_profiler())
+        self.assertEqual(profiler.stats['traverse_tree']['calls'], len(options))
+
+
+if __name__ == '__main__':
+    unittest.main()
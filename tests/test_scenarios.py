@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+import numpy as np
+
+from binompricer import BinomialTreeOption
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer import price_scenarios
+
+params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=2, volatility=0.3)
+
+
+class ScenariosTest(unittest.TestCase):
+
+    def test_scenario_cube(self):
+        """
+        Tests that every scenario of the cube matches the premium of an option built with the shocked parameters
+        """
+        spot_shifts, vol_shifts, rate_shifts = [-0.1, 0, 0.2], [-0.05, 0.1], [-0.01, 0, 0.01, 0.02]
+        for model, kwargs in ((BinomialCRROption, dict(steps=50, is_put=True, is_american=True)),
+                              (BinomialCRROption, dict(steps=50, smoothing='bbs', is_american=True)),
+                              (BinomialLROption, dict(steps=51, is_put=True)),
+                              (BinomialCRROption, dict(steps=50, is_american=True, dividents=0.02,
+                                                       divident_schedule=[(0.5, 1.0), (1.5, 1.0)]))):
+            cube = price_scenarios(model(**params, **kwargs), spot_shifts, vol_shifts, rate_shifts)
+            self.assertEqual(cube.shape, (3, 2, 4))
+            for i, spot_shift in enumerate(spot_shifts):
+                for j, vol_shift in enumerate(vol_shifts):
+                    for k, rate_shift in enumerate(rate_shifts):
+                        option = model(**dict(params, initial_price=50 * (1 + spot_shift),
+                                              volatility=0.3 + vol_shift, int_rate=0.05 + rate_shift), **kwargs)
+                        self.assertAlmostEqual(cube[i, j, k], option.price(), 10)
+
+        # The price changes of the base tree do not depend on the volatility, and spot shifts can be absolute
+        option = BinomialTreeOption(steps=20, price_changes=[1.1, 0.9], is_american=True, is_put=True,
+                                    **dict(params, volatility=0))
+        cube = price_scenarios(option, [-5, 5], [0, 0.2], relative_spot=False)
+        self.assertEqual(cube.shape, (2, 2, 1))
+        np.testing.assert_allclose(cube[:, 0], cube[:, 1], rtol=1e-14)
+        self.assertAlmostEqual(cube[1, 0, 0],
+                               BinomialTreeOption(steps=20, price_changes=[1.1, 0.9], is_american=True, is_put=True,
+                                                  **dict(params, initial_price=55)).price(), 10)
+
+    def test_invalid_scenarios(self):
+        """
+        Tests for ValueError when the scenarios cannot be priced
+        """
+        with self.assertRaisesRegex(ValueError, "Scenarios need a binomial option on a 'multiply' tree"):
+            price_scenarios(BinomialTreeOption(steps=4, price_changes=[2, 1], tree_method='add', **params), [0.1])
+        with self.assertRaisesRegex(ValueError, "The shocked initial prices have to be positive."):
+            price_scenarios(BinomialCRROption(steps=10, **params), [-1])
+        with self.assertRaisesRegex(ValueError, "The shocked volatilities have to be positive."):
+            price_scenarios(BinomialCRROption(steps=10, **params), vol_shifts=[-0.3])
+        with self.assertRaisesRegex(ValueError, "The shocks have to be given as vectors."):
+            price_scenarios(BinomialCRROption(steps=10, **params), [[0.1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import sys
+import os
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+import asyncio
+import math
+
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer import BinomialTreeFutures
+from binompricer import AsyncPricer
+
+params = dict(initial_price=50, int_rate=0.05, maturity=2, volatility=0.3)
+
+
+class AsyncPricerTest(unittest.TestCase):
+
+    def test_coalescing_and_batching(self):
+        """
+        Tests that identical requests share one pricing, that the requests of a window are priced in one
+        batch, and that the premiums match pricing each contract
+        """
+        contracts = [BinomialCRROption(strike=strike, steps=100, is_put=put, is_american=True, **params)
+                     for strike, put in ((45, True), (50, False), (52, True), (55, True))]
+        contracts += [BinomialCRROption(strike=52, steps=100, is_put=True, is_american=True, **params),
+                      BinomialLROption(strike=52, steps=51, is_put=True, **params),
+                      BinomialTreeFutures(initial_price=100, maturity=1, steps=10, price_changes=[1.1, 0.9],
+                                          probs=[None, None])]
+        expected = [contract.price() for contract in contracts]
+
+        async def price_all():
+            async with AsyncPricer(batch_window=0.05) as pricer:
+                premiums = await asyncio.gather(*(pricer.price(contract) for contract in contracts + contracts[:2]))
+            return pricer, premiums
+
+        pricer, premiums = asyncio.run(price_all())
+        for premium, price in zip(premiums, expected + expected[:2]):
+            self.assertAlmostEqual(premium, price, 10)
+        self.assertEqual((pricer.requests, pricer.coalesced, pricer.batches), (9, 3, 1))
+        percentiles = pricer.latency_percentiles((50, 99))
+        self.assertEqual(list(percentiles), [50, 99])
+        self.assertTrue(0 < percentiles[50] <= percentiles[99])
+        self.assertTrue(math.isnan(AsyncPricer().latency_percentiles()[50]))
+
+    def test_event_loop_is_not_blocked(self):
+        """
+        Tests that the event loop runs while a large tree is priced, and that a batch is sent
+        as soon as it is full
+        """
+        async def price_with_ticker():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.001)
+                    ticks += 1
+
+            task = asyncio.get_running_loop().create_task(ticker())
+            async with AsyncPricer(batch_window=10, max_batch_size=1) as pricer:
+                premium = await pricer.price(BinomialCRROption(strike=52, steps=3000, is_put=True, is_american=True,
+                                                               **params))
+            task.cancel()
+            return premium, ticks
+
+        premium, ticks = asyncio.run(price_with_ticker())
+        self.assertGreater(premium, 0)
+        self.assertGreater(ticks, 0)
+
+    def test_errors(self):
+        """
+        Tests that a contract that cannot be priced raises in its request only
+        """
+        failing = BinomialCRROption(strike=52, steps=10, **params)
+        failing.steps = -1
+
+        async def price_both():
+            async with AsyncPricer() as pricer:
+                return await asyncio.gather(pricer.price(failing),
+                                            pricer.price(BinomialCRROption(strike=52, steps=10, **params)),
+                                            return_exceptions=True)
+
+        error, premium = asyncio.run(price_both())
+        self.assertIsInstance(error, ValueError)
+        self.assertAlmostEqual(premium, BinomialCRROption(strike=52, steps=10, **params).price(), 10)
+        with self.assertRaisesRegex(ValueError, "The batch window cannot be negative."):
+            AsyncPricer(batch_window=-1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import sys
 import os
+
+import numpy as np
 # Get the path to the parent directory (project directory)
 project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # Add the project directory to the Python path
@@ -150,6 +152,61 @@ class StockTest(unittest.TestCase):
         with self.assertRaisesRegex(ValueError, "The 'int_rates_tree' must have length at least equal to 'steps' - 1."):
             _ = Stock(price_tree=price_tree, int_rates_tree=int_rates_tree2)
 
+    def test_calc_price_tree(self):
+        """ Test the closed form price tree for the 'multiply' and 'add' tree methods """
+        stock = Stock(initial_price=100, steps=3, price_changes=[1.2, 0.8], tree_method='multiply')
+        stock.calc_price_tree()
+        expected = [[100], [120, 80], [144, 96, 64], [172.8, 115.2, 76.8, 51.2]]
+        for level, expected_level in zip(stock.price_tree, expected):
+            np.testing.assert_allclose(level, expected_level)
+
+        stock = Stock(initial_price=100, steps=3, price_changes=[2, 1], tree_method='add')
+        stock.calc_price_tree()
+        expected = [[100], [102, 99], [104, 101, 98], [106, 103, 100, 97]]
+        for level, expected_level in zip(stock.price_tree, expected):
+            np.testing.assert_allclose(level, expected_level)
+
+    def test_calc_risk_neutral_probs(self):
+        """ Test the scalar probabilities of constant trees and the dense probabilities of general trees """
+        stock = Stock(initial_price=100, steps=3, price_changes=[1.2, 0.8], int_rate=0.05)
+        stock.calc_price_tree()
+        stock.calc_interest_factors()
+        stock.calc_risk_neutral_probs()
+        qu = (np.exp(0.05 / 3) - 0.8) / (1.2 - 0.8)
+        self.assertAlmostEqual(stock.qu, qu, 12)
+        self.assertAlmostEqual(stock.risk_free_probs_down[2], 1 - qu, 12)
+
+        stock = Stock(initial_price=100, steps=3, price_changes=[2, 1], tree_method='add', int_rate=0.05)
+        stock.calc_price_tree()
+        stock.calc_interest_factors()
+        stock.calc_risk_neutral_probs()
+        self.assertIsNone(stock.qu)
+        self.assertEqual(stock.risk_free_probs_up.data.dtype, np.float64)
+        for n in range(3):
+            expected = ((stock.price_tree[n] * np.exp(0.05 / 3) - stock.price_tree[n + 1][1:])
+                        / (stock.price_tree[n + 1][:-1] - stock.price_tree[n + 1][1:]))
+            np.testing.assert_allclose(stock.risk_free_probs_up[n], expected)
+
+    def test_calc_interest_factors(self):
+        """ Test the packed interest factors and discounts of an interest rates tree """
+        int_rates_tree = [[0.02469261], [0.01980263, 0.0295588], [0.00995033, 0.02469261, 0.03440143]]
+        futures_price_tree = [[100], [115, 87], [133, 100, 75], [152, 115, 87, 65]]
+        stock = Stock(price_tree=futures_price_tree, int_rates_tree=int_rates_tree, maturity=3, dividents=0.01)
+        stock.calc_interest_factors()
+        self.assertEqual(stock.int_rates_tree.tolist(), int_rates_tree)
+        for n, rates in enumerate(int_rates_tree):
+            np.testing.assert_allclose(stock.interest_factors[n], np.exp(np.array(rates) - 0.01))
+            np.testing.assert_allclose(stock.discounts[n], np.exp(-(np.array(rates) - 0.01)))
+
+        # Options fold the discounts into the probabilities
+        stock.fold_discounts = True
+        stock.calc_interest_factors()
+        stock.calc_risk_neutral_probs()
+        self.assertEqual(stock.discounts[2], 1)
+        for n in range(3):
+            discounted = stock.risk_free_probs_up[n] + stock.risk_free_probs_down[n]
+            np.testing.assert_allclose(discounted, 1 / stock.interest_factors[n])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import sys
+import os
+# Get the path to the parent directory (project directory)
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the project directory to the Python path
+sys.path.insert(0, project_dir)
+
+import math
+
+import numpy as np
+
+from binompricer import BinomialCRROption
+from binompricer import BinomialLROption
+from binompricer import TrinomialTreeOption
+from binompricer import PricingCache
+
+params = dict(initial_price=50, strike=52, int_rate=0.05, maturity=2, volatility=0.3, is_put=True)
+
+
+class TrinomialTreeTest(unittest.TestCase):
+
+    def test_european_put(self):
+        """
+        Tests the convergence of a European put to the Black-Scholes price
+        """
+        eu_put_price = 6.760140373699151
+        trinomial_error = abs(TrinomialTreeOption(steps=100, **params).price() - eu_put_price)
+        crr_error = abs(BinomialCRROption(steps=100, **params).price() - eu_put_price)
+        self.assertLess(trinomial_error, 6e-3)
+        self.assertLess(trinomial_error, crr_error)
+
+        # With a stretch of one the middle state has no probability
+        self.assertEqual(TrinomialTreeOption(steps=50, stretch=1, **params).qm, 0)
+
+    def test_american_put(self):
+        """
+        Tests an American put against a fine Leisen - Reimer tree
+        """
+        am_put_price = BinomialLROption(steps=2001, is_american=True, **params).price(premium_only=True)
+        option = TrinomialTreeOption(steps=200, is_american=True, **params)
+        self.assertAlmostEqual(option.price(), am_put_price, 2)
+        self.assertAlmostEqual(option.price(premium_only=True), option.premium, 12)
+        cache = PricingCache()
+        for _ in range(2):
+            self.assertAlmostEqual(cache.price(TrinomialTreeOption(steps=200, is_american=True, **params)),
+                                   option.premium, 12)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Single precision lattices are cached apart and stay within 1e-5 of double precision
+        single = TrinomialTreeOption(steps=200, is_american=True, dtype=np.float32, **params)
+        self.assertLess(abs(cache.price(single) / option.premium - 1), 1e-5)
+        self.assertLess(abs(single.price(premium_only=True) / option.premium - 1), 1e-5)
+        self.assertEqual(cache.misses, 2)
+
+    def test_hedging_and_greeks(self):
+        """
+        Tests the hedge ratios between the outer children of every node, and the greeks against a Leisen - Reimer tree
+        """
+        option = TrinomialTreeOption(steps=4, **params)
+        option.price()
+        hedge_ratios = option.calc_hedge_ratios()
+        self.assertEqual([len(level) for level in hedge_ratios], [1, 3, 5, 7])
+        for n in range(4):
+            expected = ((option.payoff_tree[n + 1][:-2] - option.payoff_tree[n + 1][2:])
+                        / (option.price_tree[n + 1][:-2] - option.price_tree[n + 1][2:]))
+            np.testing.assert_allclose(hedge_ratios[n], expected)
+        self.assertEqual(option.calc_hedge_ratios(2).tolist(), hedge_ratios.tolist()[:2])
+
+        greeks = TrinomialTreeOption(steps=200, **params).greeks()
+        reference = BinomialLROption(steps=201, **params).greeks()
+        for name in ('delta', 'gamma', 'theta', 'vega', 'rho'):
+            self.assertAlmostEqual(greeks[name], reference[name], delta=1e-2 * max(1, abs(reference[name])))
+        self.assertEqual(greeks['delta'], TrinomialTreeOption(steps=200, **params).greeks()['delta'])
+
+    def test_invalid_parameters(self):
+        """
+        Tests for ValueError when the parameters do not give a valid trinomial tree
+        """
+        with self.assertRaisesRegex(ValueError, "The trinomial tree needs a positive 'volatility'."):
+            TrinomialTreeOption(steps=10, **dict(params, volatility=0))
+        with self.assertRaisesRegex(ValueError, "The stretch of the trinomial tree has to be at least 1."):
+            TrinomialTreeOption(steps=10, stretch=0.5, **params)
+        with self.assertRaisesRegex(ValueError, "The trinomial probabilities are negative"):
+            TrinomialTreeOption(steps=1, stretch=math.sqrt(1.5), **dict(params, volatility=0.05, int_rate=0.5))
+
+
+if __name__ == '__main__':
+    unittest.main()